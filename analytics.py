@@ -0,0 +1,142 @@
+from pymongo import UpdateOne
+from db import db, bookings, bookings_archive, room_usage
+from indexes import ensure_indexes
+from time_utils import parse_time_range
+from sites import DEFAULT_SITE, site_of, site_filter
+
+# Utilization counters: one room_usage document per (site, room, date, department, hour) holding
+# booked minutes in that hour plus the bookings/attendees of meetings starting in it.
+# /book, /assistant and cancellations $inc them as they happen, so reports read a number of
+# documents bounded by rooms x days in range, never the bookings history itself.
+# rebuild() recomputes everything from bookings and bookings_archive with one aggregation.
+
+def slot_minutes(start, end):
+    return start.hour * 60 + start.minute, end.hour * 60 + end.minute
+
+
+def _hour_slices(start_min, end_min):
+    # Minutes of [start_min, end_min) that fall in each clock hour
+    for hour in range(start_min // 60, (end_min + 59) // 60):
+        yield hour, min(end_min, (hour + 1) * 60) - max(start_min, hour * 60)
+
+
+def _updates(booking, department, sign):
+    start_min, end_min = slot_minutes(*parse_time_range(booking["date"], booking["time"]))
+    ops = []
+    for hour, minutes in _hour_slices(start_min, end_min):
+        inc = {"minutes": sign * minutes}
+        if not ops:
+            inc["bookings"] = sign
+            inc["attendees"] = sign * int(booking.get("attendees") or 0)
+        key = {"site": site_of(booking), "room": booking["room"], "date": booking["date"],
+               "department": department or "Unknown", "hour": hour}
+        ops.append(UpdateOne(key, {"$inc": inc}, upsert=True))
+    return ops
+
+
+def record_booking(booking, department):
+    room_usage.bulk_write(_updates(booking, department, 1), ordered=False)
+
+
+def record_cancellation(booking, department):
+    # Bookings from before the counters have no start_min until rebuild() backfills it, and
+    # were never counted; taking them back would drive the counters negative
+    if booking.get("start_min") is None:
+        return
+    room_usage.bulk_write(_updates(booking, department, -1), ordered=False)
+
+
+REBUILD_PIPELINE = [
+    {"$unionWith": bookings_archive.name},
+    {"$match": {"start_min": {"$type": "number"}, "end_min": {"$type": "number"}}},
+    {"$lookup": {"from": "employees", "localField": "booked_by", "foreignField": "employee_id", "as": "employee"}},
+    {"$project": {
+        "site": {"$ifNull": ["$site", DEFAULT_SITE]},
+        "room": 1,
+        "date": 1,
+        "start_min": 1,
+        "end_min": 1,
+        "attendees": {"$ifNull": ["$attendees", 0]},
+        "department": {"$ifNull": [{"$arrayElemAt": ["$employee.department", 0]}, "Unknown"]},
+        "first_hour": {"$toInt": {"$floor": {"$divide": ["$start_min", 60]}}},
+        "hour": {"$range": [
+            {"$toInt": {"$floor": {"$divide": ["$start_min", 60]}}},
+            {"$toInt": {"$ceil": {"$divide": ["$end_min", 60]}}}
+        ]}
+    }},
+    {"$unwind": "$hour"},
+    {"$group": {
+        "_id": {"site": "$site", "room": "$room", "date": "$date", "department": "$department", "hour": "$hour"},
+        "minutes": {"$sum": {"$subtract": [
+            {"$min": ["$end_min", {"$multiply": [{"$add": ["$hour", 1]}, 60]}]},
+            {"$max": ["$start_min", {"$multiply": ["$hour", 60]}]}
+        ]}},
+        "bookings": {"$sum": {"$cond": [{"$eq": ["$hour", "$first_hour"]}, 1, 0]}},
+        "attendees": {"$sum": {"$cond": [{"$eq": ["$hour", "$first_hour"]}, "$attendees", 0]}}
+    }},
+    {"$project": {
+        "_id": 0,
+        "site": "$_id.site",
+        "room": "$_id.room",
+        "date": "$_id.date",
+        "department": "$_id.department",
+        "hour": "$_id.hour",
+        "minutes": 1,
+        "bookings": 1,
+        "attendees": 1
+    }},
+    {"$out": "room_usage_rebuild"}
+]
+
+
+def rebuild():
+    # Bookings stored before start_min/end_min existed only have the time string
+    for collection in (bookings, bookings_archive):
+        for b in collection.find({"start_min": {"$exists": False}}, {"date": 1, "time": 1}):
+            try:
+                start_min, end_min = slot_minutes(*parse_time_range(b["date"], b["time"]))
+            except Exception:
+                continue
+            collection.update_one({"_id": b["_id"]}, {"$set": {"start_min": start_min, "end_min": end_min}})
+
+    list(bookings.aggregate(REBUILD_PIPELINE))
+    db["room_usage_rebuild"].rename(room_usage.name, dropTarget=True)
+    ensure_indexes(room_usage.name)
+
+
+def report(date_from, date_to, capacities, group_by="room", room=None, department=None, site=DEFAULT_SITE):
+    query = {"site": site_filter(site), "date": {"$gte": date_from, "$lte": date_to}}
+    if room:
+        query["room"] = room
+    if department:
+        query["department"] = department
+
+    groups = {}
+    for doc in room_usage.find(query, {"_id": 0}):
+        g = groups.setdefault(doc[group_by], {"minutes": 0, "bookings": 0, "attendees": 0, "seats": 0, "hours": {}})
+        g["minutes"] += doc.get("minutes", 0)
+        g["bookings"] += doc.get("bookings", 0)
+        g["attendees"] += doc.get("attendees", 0)
+        g["seats"] += doc.get("bookings", 0) * capacities.get(doc["room"], 0)
+        g["hours"][doc["hour"]] = g["hours"].get(doc["hour"], 0) + doc.get("minutes", 0)
+
+    rows = []
+    for key, g in sorted(groups.items()):
+        if not g["minutes"] and not g["bookings"]:
+            continue  # everything in it was cancelled
+        busiest = [h for h, m in g["hours"].items() if m > 0]
+        peak = max(busiest, key=lambda h: g["hours"][h]) if busiest else None
+        rows.append({
+            group_by: key,
+            "booked_hours": round(g["minutes"] / 60, 2),
+            "bookings": g["bookings"],
+            # Attendees against the seats of the rooms they booked
+            "fill_rate": round(g["attendees"] / g["seats"], 3) if g["seats"] else None,
+            "peak_hour": f"{peak:02d}:00" if peak is not None else None
+        })
+    return rows
+
+
+if __name__ == "__main__":
+    rebuild()
+    print(f"Rebuilt {room_usage.count_documents({})} utilization counters")
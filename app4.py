@@ -1,68 +1,167 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, stream_with_context, abort, make_response
+from werkzeug.exceptions import HTTPException
 from db import bookings
 from db import employees
-from utils import get_embedding, is_purpose_similar
-from models import is_valid_room
-from datetime import datetime, timedelta
-from langchain_ollama import OllamaLLM
-from langchain.prompts import PromptTemplate
+from utils import get_embedding, is_purpose_similar, ollama_generate
+from room_catalog import catalog, is_valid_room
+from directory import directory
+from sites import DEFAULT_SITE, site_filter
+from time_utils import times_overlap, parse_time_range, normalize_slot, resolve_date, resolve_date_range, resolve_time_range
+from scheduler import is_any_room, pick_room, assign_rooms
+import analytics
+import indexes
+import archive
+import changes
+import room_events
+from pymongo import ReturnDocument
 from langchain.output_parsers import PydanticOutputParser
-from pydantic import BaseModel
-from typing import Optional
+from prompts import (BookingDetails, field_labels, intent_fields, optional_fields, bulk_optional_fields,
+                     build_llm_request, OLLAMA_MODEL, llm_options)
 from flask_cors import CORS
 from bson import ObjectId
+import os
+from datetime import datetime, timedelta, timezone
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+import metrics
+import applog
+import assets
+from metrics import stage
+from intent import classify_intent
+from cache import TTLCache
+from idempotency import idempotent
+from ratelimit import rate_limited
 
 
 app = Flask(__name__)
 CORS(app)
-class BookingDetails(BaseModel):
-    room: Optional[str] = None
-    attendees: Optional[int] = None
-    date: Optional[str] = None
-    time: Optional[str] = None
-    purpose: Optional[str] = None
-    employee_id: Optional[str] = None
-    intent: str = "book"
-
-prompt_template = """
-You are a helpful office assistant. Extract the following from the user's input and respond with only a JSON object matching the specified format:
-- Room name
-- Number of people
-- Date (convert any relative dates like 'tomorrow' or 'next Monday' to absolute YYYY-MM-DD format)
-- Time slot (strictly use 12-hour format like 'HH:MM AM/PM to HH:MM AM/PM' or 'HH:MM AM/PM - HH:MM AM/PM'; do not use 24-hour format)
-- Purpose
-- Employee ID
-- Intent: one of "book", "cancel", "view"
-Respond ONLY with a **valid JSON object**, enclosed in triple backticks. DO NOT add extra explanation, markdown, or bullet points.
-User: {user_input}
-Respond only with a JSON object containing values for these fields, enclosed in triple backticks and formatted as valid JSON:
-```json
-{format_instructions}
-```
-"""
-
+metrics.init_app(app)
+applog.init_app(app)
+assets.init_app(app)
 parser = PydanticOutputParser(pydantic_object=BookingDetails)
-prompt = PromptTemplate(template=prompt_template, input_variables=["user_input"], partial_variables={"format_instructions": parser.get_format_instructions()}, output_parser=parser)
 
-ollama = OllamaLLM(model="llama3.2")  # ensure model name matches your pulled model
+# Independent reads behind /dashboard_state run side by side on this pool
+query_pool = ThreadPoolExecutor(max_workers=8)
+
+# Partially filled requests waiting for the user to supply the missing fields, keyed by session_id
+sessions = TTLCache(maxsize=5000, ttl=15 * 60)
+
+def extract_fields(user_input, fields, usage):
+    system, schema = build_llm_request(tuple(fields))
+    with stage("llm_invoke"):
+        data = ollama_generate(f"User: {user_input}", system=system, model=OLLAMA_MODEL,
+                               options=llm_options, format=schema)
+    usage["llm_tokens"] += data.get("prompt_eval_count", 0) + data.get("eval_count", 0)
+    usage["llm_seconds"] += data.get("total_duration", 0) / 1e9
+    return data["response"].strip()
 
 import re
 
-def times_overlap(start1, end1, start2, end2):
-    return max(start1, start2) < min(end1, end2)
+def best_effort(stage_name, fn, *args):
+    # Side records (usage counters, change feed) must not fail the write that triggered them
+    try:
+        with stage(stage_name):
+            fn(*args)
+    except Exception:
+        metrics.inc("sementor_side_effect_errors_total", stage=stage_name)
+
+def request_site(emp_record=None):
+    # Explicit ?site= or body "site", then the employee's home office, then the default
+    data = request.get_json(silent=True)
+    data = data if isinstance(data, dict) else {}
+    site = request.args.get("site") or data.get("site") or (emp_record or {}).get("site") or DEFAULT_SITE
+    if site not in catalog.sites():
+        abort(make_response(jsonify({"status": "fail", "reason": f"Unknown site: {site}"}), 400))
+    return site
+
+def booked_intervals(dates, site):
+    # (room, start, end) for every parseable booking at the site on the given dates
+    intervals = []
+    for b in bookings.find({"site": site_filter(site), "date": {"$in": list(dates)}}, {"room": 1, "date": 1, "time": 1}):
+        try:
+            intervals.append((b["room"], *parse_time_range(b["date"], b["time"])))
+        except Exception:
+            continue
+    return intervals
+
+def starts_at(time_text):
+    # Matches bookings by start time rather than by their stored time string, so "3pm"
+    # finds a 3:00-4:30 PM booking. Bookings from before start_min existed fall back to
+    # the leading time in their string, whichever separator it uses.
+    span = resolve_time_range(time_text)
+    if not span:
+        return None
+    start = span[0]
+    hour12 = start.hour % 12 or 12
+    pattern = rf"^0?{hour12}:{start.minute:02d}\s*{'AM' if start.hour < 12 else 'PM'}"
+    return {"$or": [
+        {"start_min": start.hour * 60 + start.minute},
+        {"start_min": {"$exists": False}, "time": {"$regex": pattern, "$options": "i"}}
+    ]}
+
+# "all my bookings", "every meeting": wording that asks for more than one booking
+BULK_WORDING = re.compile(r"\b(?:all|every|each|both|bookings|meetings|reservations)\b", re.I)
+# Matches listed back when a single-booking cancel is ambiguous
+MAX_CANCEL_CHOICES = 20
+
+def is_bulk_request(utterance, date_text):
+    span = resolve_date_range(date_text)
+    return bool(span and span[0] != span[1]) or bool(BULK_WORDING.search(utterance))
+
+# A claim older than this belongs to a cancel that died before its delete_many
+CANCEL_CLAIM_TIMEOUT = timedelta(minutes=5)
+
+def cancel_bookings(query):
+    # Claim the matches with one update_many, then read and delete them by the claim token.
+    # A booking can only be claimed once, so when cancels overlap each booking is freed,
+    # counted and announced by exactly one of them. Invites live inside the booking
+    # document, so they go with it and the change feed tells every invitee.
+    token = uuid.uuid4().hex
+    now = datetime.now(timezone.utc)
+    unclaimed = {"$or": [{"cancel_op": {"$exists": False}}, {"cancel_op.at": {"$lt": now - CANCEL_CLAIM_TIMEOUT}}]}
+    with stage("delete"):
+        claimed = bookings.update_many({"$and": [query, unclaimed]}, {"$set": {"cancel_op": {"token": token, "at": now}}})
+        if not claimed.modified_count:
+            return []
+        doomed = list(bookings.find({"cancel_op.token": token}, {"embedding": 0, "cancel_op": 0}))
+        bookings.delete_many({"cancel_op.token": token})
+
+    with stage("employee_lookup"):
+        departments = {e["employee_id"]: e.get("department") for e in employees.find(
+            {"employee_id": {"$in": list({b.get("booked_by") for b in doomed})}}, {"employee_id": 1, "department": 1}
+        )}
+    freed = []
+    for b in doomed:
+        best_effort("usage_counters", analytics.record_cancellation, b, departments.get(b.get("booked_by")))
+        best_effort("change_feed", changes.record_change, "booking", "cancelled", b)
+        best_effort("room_events", room_events.publish, "freed", b)
+        freed.append({
+            "booking_id": str(b["_id"]),
+            "room": b.get("room"),
+            "date": b.get("date"),
+            "time": b.get("time"),
+            "booked_by": b.get("booked_by"),
+            "invitees_notified": [i.get("employee_id") for i in b.get("invites", [])]
+        })
+    return freed
 
-def parse_time_range(date_str, time_range):
-    parts = time_range.split(" to ") if " to " in time_range else time_range.split(" - ")
-    start = datetime.strptime(f"{date_str} {parts[0].strip()}", "%Y-%m-%d %I:%M %p")
-    end = datetime.strptime(f"{date_str} {parts[1].strip()}", "%Y-%m-%d %I:%M %p")
-    return start, end
+def find_clash(existing_bookings, start_time, end_time):
+    for clash in existing_bookings:
+        try:
+            clash_start, clash_end = parse_time_range(clash["date"], clash["time"])
+        except Exception:
+            continue  # skip invalid time format in DB
+        if times_overlap(start_time, end_time, clash_start, clash_end):
+            return clash
+    return None
 
 @app.route("/book", methods=["POST"])
+@idempotent
+@rate_limited()
 def book_room():
     data = request.json
     room = data["room"]
-    date = data["date"]
-    time = data["time"]
+    date, time = normalize_slot(data["date"], data["time"])
     attendees = data["attendees"]
     purpose = data["purpose"]
     booked_by = data["booked_by"]
@@ -76,14 +175,16 @@ def book_room():
             }), 400
 
         # Check if employee exists in the employees collection
-        emp_record = employees.find_one({"employee_id": booked_by})
+        with stage("employee_lookup"):
+            emp_record = employees.find_one({"employee_id": booked_by})
         if not emp_record:
             return jsonify({
                 "status": "fail",
                 "reason": "Unauthorized: Employee ID not found in system."
             }), 403
+        site = request_site(emp_record)
         # 1. Validate room capacity
-        if not is_valid_room(room, attendees):
+        if not is_any_room(room) and not is_valid_room(room, attendees, site):
             return jsonify({"status": "fail", "reason": "Room over capacity"}), 400
 
         # Parse the incoming time range
@@ -92,75 +193,161 @@ def book_room():
         except Exception:
             return jsonify({"status": "fail", "reason": "Invalid time format. Use 'HH:MM AM/PM to HH:MM AM/PM' or 'HH:MM AM/PM - HH:MM AM/PM'."}), 400
 
+        # "Any room": take the smallest room that fits and is free
+        if is_any_room(room):
+            with stage("room_assign"):
+                room = pick_room(attendees, start_time, end_time, booked_intervals([date], site), catalog.capacities(site))
+            if not room:
+                return jsonify({"status": "fail", "reason": f"No room is free for {attendees} people at this time"}), 409
+
         # 2. Check for existing bookings with time overlap by fetching all bookings for room and date
-        existing_bookings = list(bookings.find({"room": room, "date": date}))
-        for clash in existing_bookings:
-            try:
-                clash_start, clash_end = parse_time_range(clash["date"], clash["time"])
-            except Exception:
-                continue  # skip invalid time format in DB
-            if times_overlap(start_time, end_time, clash_start, clash_end):
+        with stage("overlap_scan"):
+            existing_bookings = list(bookings.find({"site": site_filter(site), "room": room, "date": date}))
+            clash = find_clash(existing_bookings, start_time, end_time)
+        if clash:
+            with stage("purpose_similarity"):
                 similar, score = is_purpose_similar(purpose, clash["purpose"])
-                if not similar and not booked_by.startswith("ADMIN"):
-                    return jsonify({
-                        "status": "fail",
-                        "reason": "Purpose mismatch with existing booking",
-                        "existing_booking": {
-                            "room": clash["room"],
-                            "date": clash["date"],
-                            "time": clash["time"],
-                            "purpose": clash["purpose"]
-                        }
-                    }), 409
-                else:
-                    return jsonify({
-                        "status": "fail",
-                        "reason": "Room is already booked at this time",
-                        "existing_booking": {
-                            "room": clash["room"],
-                            "date": clash["date"],
-                            "time": clash["time"],
-                            "purpose": clash["purpose"]
-                        }
-                    }), 409
+            if not similar and not booked_by.startswith("ADMIN"):
+                return jsonify({
+                    "status": "fail",
+                    "reason": "Purpose mismatch with existing booking",
+                    "existing_booking": {
+                        "room": clash["room"],
+                        "date": clash["date"],
+                        "time": clash["time"],
+                        "purpose": clash["purpose"]
+                    }
+                }), 409
+            else:
+                return jsonify({
+                    "status": "fail",
+                    "reason": "Room is already booked at this time",
+                    "existing_booking": {
+                        "room": clash["room"],
+                        "date": clash["date"],
+                        "time": clash["time"],
+                        "purpose": clash["purpose"]
+                    }
+                }), 409
 
         # 3. All good – book it
         booking = {
+            "site": site,
             "room": room,
             "date": date,
             "time": time,
             "attendees": attendees,
             "purpose": purpose,
-            "embedding": get_embedding(purpose).tolist(),
             "booked_by": booked_by
         }
-        bookings.insert_one(booking)
+        booking["start_min"], booking["end_min"] = analytics.slot_minutes(start_time, end_time)
+        with stage("embedding"):
+            booking["embedding"] = get_embedding(purpose).tolist()
+        with stage("insert"):
+            bookings.insert_one(booking)
+        best_effort("usage_counters", analytics.record_booking, booking, emp_record.get("department"))
+        best_effort("change_feed", changes.record_change, "booking", "created", booking)
+        best_effort("room_events", room_events.publish, "booked", booking)
         return jsonify({"status": "success", "booking": booking}), 200
+    except HTTPException:
+        raise
     except Exception as e:
         return jsonify({"status": "error", "reason": "An unexpected error occurred", "error": str(e)}), 500
 
 @app.route("/assistant", methods=["POST"])
+@idempotent
+@rate_limited("llm")
 def assistant():
     user_input = request.json["prompt"]
-    formatted_prompt = prompt.format_prompt(user_input=user_input)
-    llm_response = ollama.invoke(formatted_prompt.to_string())
+    session_id = request.json.get("session_id") or str(uuid.uuid4())
+    session = sessions.get(session_id)
+    usage = session["usage"] if session else {"llm_tokens": 0, "llm_seconds": 0.0, "turns": 0}
+    usage["turns"] += 1
+
+    if session:
+        # Follow-up turn: only the fields still missing are extracted, with a tiny prompt
+        intent = session["details"]["intent"]
+        fields = session["missing"]
+        utterance = f"{session['utterance']} {user_input}"
+    else:
+        with stage("intent_classify"):
+            intent, intent_score = classify_intent(user_input)
+        fields = intent_fields[intent] if intent in intent_fields else []
+        utterance = user_input
+
+    if intent == "invite":
+        metrics.inc("sementor_intent_route_total", intent=intent, path="local")
+        return jsonify({
+            "status": "error",
+            "message": "To invite colleagues, open the booking on your dashboard and use the Invite button."
+        }), 400
 
-# Log or print the raw response for debugging
-    print("LLM Response:\n", llm_response)
+    # "Show my bookings EMP0003" needs nothing but the employee ID – skip the LLM entirely
+    emp_match = re.search(r"\b(?:EMP|ADMIN)\d{4}\b", user_input)
+    if fields == ["employee_id"] and emp_match:
+        metrics.inc("sementor_intent_route_total", intent=intent, path="local")
+        llm_response = None
+        parsed_output = BookingDetails(intent=intent, employee_id=emp_match.group(0))
+    else:
+        metrics.inc("sementor_intent_route_total", intent=intent or "unknown", path="llm")
+        llm_response = extract_fields(user_input, fields, usage)
+        applog.info("llm_response", intent=intent, llm_output=llm_response)
 
     # Try parsing safely
     try:
-        # Attempt to clean malformed JSON if parsing fails
-        llm_cleaned = re.sub(r"```json|```", "", llm_response).strip()
-        try:
-            parsed_output = parser.parse(llm_cleaned)
-        except Exception as e:
+        if llm_response is not None:
+            # Attempt to clean malformed JSON if parsing fails
+            llm_cleaned = re.sub(r"```json|```", "", llm_response).strip()
+            try:
+                with stage("parse"):
+                    parsed_output = parser.parse(llm_cleaned)
+                metrics.inc("sementor_llm_parse_total", result="ok")
+            except Exception as e:
+                metrics.inc("sementor_llm_parse_total", result="failure")
+                return jsonify({
+                    "status": "error",
+                    "message": "Failed to parse cleaned LLM response",
+                    "llm_output": llm_response,
+                    "error": str(e)
+                }), 500
+            if intent:
+                parsed_output.intent = intent
+
+        if session:
+            merged = BookingDetails(**session["details"])
+            for field in fields:
+                value = getattr(parsed_output, field)
+                if value is not None:
+                    setattr(merged, field, value)
+            parsed_output = merged
+
+        # The LLM copies date/time spans verbatim; resolve them to YYYY-MM-DD and a 12-hour range locally.
+        # The session keeps the date as typed, since normalizing "next week" keeps only one day of it.
+        date_text = parsed_output.date
+        if session and "date" not in fields:
+            date_text = session.get("date_text") or date_text
+        if parsed_output.date or parsed_output.time:
+            parsed_output.date, parsed_output.time = normalize_slot(parsed_output.date, parsed_output.time)
+
+        # Ask for whatever is still missing instead of failing; the next turn only extracts those fields
+        bulk = is_bulk_request(utterance, date_text)
+        optional = optional_fields.get(parsed_output.intent, set())
+        if bulk:
+            optional = optional | bulk_optional_fields.get(parsed_output.intent, set())
+        missing = [f for f in intent_fields.get(parsed_output.intent, [])
+                   if f not in optional and getattr(parsed_output, f) in (None, "")]
+        if missing:
+            sessions.set(session_id, {"details": parsed_output.dict(), "missing": missing, "usage": usage,
+                                      "date_text": date_text, "utterance": utterance})
             return jsonify({
-                "status": "error",
-                "message": "Failed to parse cleaned LLM response",
-                "llm_output": llm_response,
-                "error": str(e)
-            }), 500
+                "status": "incomplete",
+                "session_id": session_id,
+                "missing": missing,
+                "message": "Please provide the " + ", ".join(field_labels[f] for f in missing) + ".",
+                "parsed": parsed_output.dict()
+            })
+        sessions.pop(session_id)
+        emp_record = None
         # Enforce employee ID regex validation immediately after parsing for specific intents
         if parsed_output.intent in ["book", "cancel", "view"]:
             if not parsed_output.employee_id or not re.fullmatch(r"(EMP|ADMIN)\d{4}", parsed_output.employee_id):
@@ -169,13 +356,15 @@ def assistant():
                     "message": "Invalid Employee ID format. It must be in the form EMPxxxx or ADMINxxxx.",
                     "parsed": parsed_output.dict()
                 }), 400
-            emp_record = employees.find_one({"employee_id": parsed_output.employee_id})
+            with stage("employee_lookup"):
+                emp_record = employees.find_one({"employee_id": parsed_output.employee_id})
             if not emp_record:
                 return jsonify({
                     "status": "error",
                     "message": "Unauthorized: Employee ID not found in system.",
                     "parsed": parsed_output.dict()
                 }), 403
+        site = request_site(emp_record)
 
         # Check for view intent
         if hasattr(parsed_output, "intent") and parsed_output.intent == "view":
@@ -187,7 +376,8 @@ def assistant():
                     "parsed": parsed_output.dict()
                 }), 400
 
-            user_bookings = list(bookings.find({"booked_by": emp_id}, {"embedding": 0}))
+            with stage("bookings_query"):
+                user_bookings = list(bookings.find({"booked_by": emp_id}, {"embedding": 0}))
             for b in user_bookings:
                 b["_id"] = str(b["_id"])
             return jsonify({
@@ -197,32 +387,52 @@ def assistant():
             })
 
         if parsed_output.intent == "cancel":
-            try:
-                start_time, end_time = parse_time_range(parsed_output.date, parsed_output.time)
-                start_str = f"{start_time.hour % 12 or 12}:{start_time.strftime('%M %p')}"
-                end_str = f"{end_time.hour % 12 or 12}:{end_time.strftime('%M %p')}"
-                normalized_time = f"{start_str} to {end_str}"
-            except Exception:
-                normalized_time = parsed_output.time.strip()
-
-            print(f"Attempting to cancel with: emp={parsed_output.employee_id}, room={parsed_output.room}, date={parsed_output.date}, time={normalized_time}")
-
-            result = bookings.delete_one({
-                "booked_by": parsed_output.employee_id,
-                "room": parsed_output.room,
-                "date": parsed_output.date,
-                "time": normalized_time
-            })
-
-            if result.deleted_count == 0:
+            # "next week" or "june 20 to june 24" cancel every match in the span
+            first, last = resolve_date_range(date_text) or (parsed_output.date, parsed_output.date)
+            query = {"booked_by": parsed_output.employee_id, "date": {"$gte": first, "$lte": last}}
+            if parsed_output.room and not is_any_room(parsed_output.room):
+                query["room"] = parsed_output.room
+            if parsed_output.time:
+                time_filter = starts_at(parsed_output.time)
+                if time_filter is None:
+                    return jsonify({
+                        "status": "error",
+                        "message": "Invalid time format. Use 'HH:MM AM/PM to HH:MM AM/PM' or 'HH:MM AM/PM - HH:MM AM/PM'.",
+                        "parsed": parsed_output.dict()
+                    }), 400
+                query.update(time_filter)
+
+            if not bulk:
+                # One booking was asked for: when several match, list them instead of guessing
+                matches = list(bookings.find(query, {"site": 1, "room": 1, "date": 1, "time": 1}).limit(MAX_CANCEL_CHOICES))
+                if len(matches) > 1:
+                    for b in matches:
+                        b["_id"] = str(b["_id"])
+                    return jsonify({
+                        "status": "confirm",
+                        "message": f"{len(matches)} bookings match. Name the room or time of the one to cancel, "
+                                   "or ask to cancel all of them.",
+                        "matches": matches,
+                        "parsed": parsed_output.dict()
+                    })
+
+            applog.info("cancel_attempt", employee_id=parsed_output.employee_id, room=query.get("room"),
+                        date_from=first, date_to=last, time=parsed_output.time)
+            freed = cancel_bookings(query)
+
+            if not freed:
                 return jsonify({
                     "status": "fail",
                     "message": "No matching booking found to cancel"
                 }), 404
-
+            if len(freed) == 1:
+                message = f"Booking on {freed[0]['date']} at {freed[0]['time']} for {parsed_output.employee_id} has been cancelled."
+            else:
+                message = f"{len(freed)} bookings between {first} and {last} for {parsed_output.employee_id} have been cancelled."
             return jsonify({
                 "status": "success",
-                "message": f"Booking on {parsed_output.date} at {normalized_time} for {parsed_output.employee_id} has been cancelled."
+                "message": message,
+                "freed": freed
             })
 
         if parsed_output.intent == "availability":
@@ -242,15 +452,16 @@ def assistant():
                     "parsed": parsed_output.dict()
                 }), 400
 
-            all_rooms = ["Brainstorm Hub", "Data Dome", "Conference Room"]
+            all_rooms = [r["name"] for r in catalog.query(min_capacity=parsed_output.attendees or 0, site=site)]
             booked_rooms = set()
-            for b in bookings.find({"date": parsed_output.date}):
-                try:
-                    start, end = parse_time_range(b["date"], b["time"])
-                    if times_overlap(desired_start, desired_end, start, end):
-                        booked_rooms.add(b["room"])
-                except Exception:
-                    continue
+            with stage("overlap_scan"):
+                for b in bookings.find({"site": site_filter(site), "date": parsed_output.date}, {"room": 1, "date": 1, "time": 1}):
+                    try:
+                        start, end = parse_time_range(b["date"], b["time"])
+                        if times_overlap(desired_start, desired_end, start, end):
+                            booked_rooms.add(b["room"])
+                    except Exception:
+                        continue
 
             available = [r for r in all_rooms if r not in booked_rooms]
             return jsonify({
@@ -261,22 +472,13 @@ def assistant():
             })
 
         # Check room capacity
-        if not is_valid_room(parsed_output.room, parsed_output.attendees):
+        if not is_any_room(parsed_output.room) and not is_valid_room(parsed_output.room, parsed_output.attendees, site):
             return jsonify({
                 "status": "error",
                 "message": f"{parsed_output.room} cannot accommodate {parsed_output.attendees} people. Please reduce the number of attendees or choose another room.",
                 "parsed": parsed_output.dict()
             }), 400
 
-        try:
-            dt = datetime.fromisoformat(parsed_output.time)
-            start = dt.strftime("%I:%M %p").lstrip("0")
-            end_dt = dt + timedelta(hours=1)
-            end = end_dt.strftime("%I:%M %p").lstrip("0")
-            parsed_output.time = f"{start} to {end}"
-        except Exception:
-            pass
-        
         # Parse the time range for overlap checking
         try:
             start_time, end_time = parse_time_range(parsed_output.date, parsed_output.time)
@@ -287,49 +489,69 @@ def assistant():
                 "parsed": parsed_output.dict()
             }), 400
 
+        if is_any_room(parsed_output.room):
+            with stage("room_assign"):
+                parsed_output.room = pick_room(parsed_output.attendees, start_time, end_time,
+                                               booked_intervals([parsed_output.date], site), catalog.capacities(site))
+            if not parsed_output.room:
+                return jsonify({
+                    "status": "fail",
+                    "message": f"No room is free for {parsed_output.attendees} people at this time.",
+                    "parsed": parsed_output.dict()
+                }), 409
+
         # Check for existing bookings with time overlap by fetching all bookings for room and date
-        existing_bookings = list(bookings.find({"room": parsed_output.room, "date": parsed_output.date}))
-        for clash in existing_bookings:
-            try:
-                clash_start, clash_end = parse_time_range(clash["date"], clash["time"])
-            except Exception:
-                continue  # skip invalid time format in DB
-            if times_overlap(start_time, end_time, clash_start, clash_end):
+        with stage("overlap_scan"):
+            existing_bookings = list(bookings.find({"site": site_filter(site), "room": parsed_output.room, "date": parsed_output.date}))
+            clash = find_clash(existing_bookings, start_time, end_time)
+        if clash:
+            with stage("purpose_similarity"):
                 similar, score = is_purpose_similar(parsed_output.purpose, clash["purpose"])
-                if not similar and not parsed_output.employee_id.startswith("ADMIN"):
-                    return jsonify({
-                        "status": "fail",
-                        "reason": "Purpose mismatch with existing booking",
-                        "existing_booking": {
-                            "room": clash["room"],
-                            "date": clash["date"],
-                            "time": clash["time"],
-                            "purpose": clash["purpose"]
-                        }
-                    }), 409
-                else:
-                    return jsonify({
-                        "status": "fail",
-                        "reason": "Room is already booked at this time",
-                        "existing_booking": {
-                            "room": clash["room"],
-                            "date": clash["date"],
-                            "time": clash["time"],
-                            "purpose": clash["purpose"]
-                        }
-                    }), 409
+            if not similar and not parsed_output.employee_id.startswith("ADMIN"):
+                return jsonify({
+                    "status": "fail",
+                    "reason": "Purpose mismatch with existing booking",
+                    "existing_booking": {
+                        "room": clash["room"],
+                        "date": clash["date"],
+                        "time": clash["time"],
+                        "purpose": clash["purpose"]
+                    }
+                }), 409
+            else:
+                return jsonify({
+                    "status": "fail",
+                    "reason": "Room is already booked at this time",
+                    "existing_booking": {
+                        "room": clash["room"],
+                        "date": clash["date"],
+                        "time": clash["time"],
+                        "purpose": clash["purpose"]
+                    }
+                }), 409
         
         booking = {
+            "site": site,
             "room": parsed_output.room,
             "date": parsed_output.date,
             "time": parsed_output.time,
             "attendees": parsed_output.attendees,
             "purpose": parsed_output.purpose,
-            "embedding": get_embedding(parsed_output.purpose).tolist(),
             "booked_by": parsed_output.employee_id
         }
-        bookings.insert_one(booking)
+        booking["start_min"], booking["end_min"] = analytics.slot_minutes(start_time, end_time)
+        with stage("embedding"):
+            booking["embedding"] = get_embedding(parsed_output.purpose).tolist()
+        with stage("insert"):
+            bookings.insert_one(booking)
+        best_effort("usage_counters", analytics.record_booking, booking, emp_record.get("department"))
+        best_effort("change_feed", changes.record_change, "booking", "created", booking)
+        best_effort("room_events", room_events.publish, "booked", booking)
         
+        metrics.observe("sementor_booking_llm_tokens", usage["llm_tokens"], buckets=metrics.TOKEN_BUCKETS)
+        metrics.observe("sementor_booking_llm_seconds", usage["llm_seconds"])
+        metrics.observe("sementor_booking_turns", usage["turns"], buckets=(1, 2, 3, 4, 5, 10))
+
         message = f"{parsed_output.attendees} people can use {parsed_output.room} on {parsed_output.date} from {parsed_output.time} to {parsed_output.purpose.lower()}."
         return jsonify({
             "status": "success",
@@ -338,6 +560,8 @@ def assistant():
             "message": message,
             "mongo_inserted": True
         })
+    except HTTPException:
+        raise
     except Exception as e:
         return jsonify({
             "status": "error",
@@ -346,8 +570,148 @@ def assistant():
             "error": str(e)
         }), 500
 
+# --- Route to list rooms from the catalog, e.g. /rooms?min_capacity=4&equipment=projector ---
+@app.route("/rooms", methods=["GET"])
+@rate_limited()
+def list_rooms():
+    min_capacity = request.args.get("min_capacity", 0, type=int)
+    equipment = request.args.getlist("equipment")
+    site = request_site()
+    room_list = [{k: v for k, v in r.items() if k != "updated_at"} for r in catalog.query(min_capacity, equipment, site)]
+    return jsonify({"site": site, "sites": catalog.sites(), "rooms": room_list}), 200
+
+# --- Route to cancel by booking ID or by range, e.g. {"employee_id": "EMP1001", "dates": "next week", "room": "Data Dome"} ---
+@app.route("/cancel", methods=["POST"])
+@idempotent
+@rate_limited()
+def cancel_route():
+    data = request.get_json() or {}
+    emp_id = data.get("employee_id")
+    if not emp_id:
+        return jsonify({"status": "fail", "reason": "Missing employee_id"}), 400
+    with stage("employee_lookup"):
+        emp_record = employees.find_one({"employee_id": emp_id}, {"is_admin": 1, "site": 1})
+    if not emp_record:
+        return jsonify({"status": "fail", "reason": "Unauthorized: Employee ID not found in system."}), 403
+
+    # Admins may clear a room or a day for everyone; everyone else only cancels their own bookings
+    query = {}
+    if not (emp_record.get("is_admin") and data.get("scope") == "all"):
+        query["booked_by"] = emp_id
+    site = request_site(emp_record)
+
+    booking_ids = data.get("booking_ids") or ([data["booking_id"]] if data.get("booking_id") else [])
+    if booking_ids:
+        try:
+            query["_id"] = {"$in": [ObjectId(b) for b in booking_ids]}
+        except Exception:
+            return jsonify({"status": "fail", "reason": "Invalid booking_id"}), 400
+    else:
+        if data.get("date_from") or data.get("date_to"):
+            first = resolve_date(data.get("date_from") or data.get("date_to"))
+            last = resolve_date(data.get("date_to") or data.get("date_from"))
+            date_range = (first, last) if first and last and first <= last else None
+        else:
+            date_range = resolve_date_range(data.get("dates") or data.get("date"))
+        if not date_range:
+            return jsonify({"status": "fail", "reason": "Provide booking_id(s) or a date range"}), 400
+        query["date"] = {"$gte": date_range[0], "$lte": date_range[1]}
+        if data.get("room") and not is_any_room(data["room"]):
+            query["room"] = data["room"]
+        if "room" in query or "booked_by" not in query:
+            # Room names and admin clear-outs are scoped to one site
+            query["site"] = site_filter(site)
+        if data.get("time"):
+            time_filter = starts_at(data["time"])
+            if time_filter is None:
+                return jsonify({"status": "fail", "reason": "Invalid time format"}), 400
+            query.update(time_filter)
+
+    applog.info("cancel_attempt", employee_id=emp_id, scope=data.get("scope", "mine"),
+                booking_ids=booking_ids, room=query.get("room"), date=query.get("date"), time=data.get("time"))
+    freed = cancel_bookings(query)
+    if not freed:
+        return jsonify({"status": "fail", "reason": "No matching booking found to cancel"}), 404
+    return jsonify({"status": "success", "cancelled": len(freed), "freed": freed}), 200
+
+# --- Route for utilization reports, e.g. /utilization?from=2025-06-01&to=2025-06-30&group_by=department ---
+@app.route("/utilization", methods=["GET"])
+@rate_limited()
+def utilization():
+    today = datetime.now().date()
+    date_from = resolve_date(request.args.get("from")) or (today - timedelta(days=30)).isoformat()
+    date_to = resolve_date(request.args.get("to")) or today.isoformat()
+    group_by = request.args.get("group_by", "room")
+    if group_by not in ("room", "date", "department"):
+        return jsonify({"status": "fail", "reason": "group_by must be one of room, date, department"}), 400
+
+    with stage("usage_report"):
+        site = request_site()
+        rows = analytics.report(date_from, date_to, catalog.capacities(site), group_by,
+                                room=request.args.get("room"), department=request.args.get("department"), site=site)
+    return jsonify({"status": "success", "site": site, "from": date_from, "to": date_to, "group_by": group_by, "report": rows}), 200
+
+# --- Route for past bookings, read from the archive instead of the live collection ---
+@app.route("/history", methods=["GET"])
+@rate_limited()
+def booking_history():
+    limit = min(request.args.get("limit", 50, type=int), 200)
+    skip = max(request.args.get("skip", 0, type=int), 0)
+    with stage("history_query"):
+        past = archive.history(
+            employee_id=request.args.get("employee_id"),
+            room=request.args.get("room"),
+            site=request_site() if request.args.get("site") else None,
+            date_from=resolve_date(request.args.get("from")),
+            date_to=resolve_date(request.args.get("to")),
+            limit=limit,
+            skip=skip
+        )
+    for b in past:
+        b["_id"] = str(b["_id"])
+    return jsonify({"status": "success", "bookings": past, "limit": limit, "skip": skip}), 200
+
+# --- Route to auto-assign rooms for a batch of meeting requests ---
+@app.route("/assign_rooms", methods=["POST"])
+@rate_limited()
+def assign_rooms_route():
+    data = request.get_json()
+    items = data.get("requests") or []
+    if not items:
+        return jsonify({"status": "fail", "reason": "Missing requests"}), 400
+
+    # Each request needs a time and attendee count; the date can be given per request or once for the batch
+    results, pending = [], []
+    for i, item in enumerate(items):
+        date, time = normalize_slot(item.get("date") or data.get("date"), item.get("time"))
+        result = {"id": item.get("id", i), "date": date, "time": time, "attendees": item.get("attendees"), "room": None}
+        results.append(result)
+        try:
+            start, end = parse_time_range(date, time)
+            attendees = int(item["attendees"])
+        except Exception:
+            result["reason"] = "Invalid date, time or attendees"
+            continue
+        pending.append({"id": i, "start": start, "end": end, "attendees": attendees})
+
+    site = request_site()
+    with stage("room_assign"):
+        existing = booked_intervals({results[r["id"]]["date"] for r in pending}, site)
+        assignments = assign_rooms(pending, catalog.capacities(site), existing)
+    for i, room in assignments.items():
+        results[i]["room"] = room
+        if room is None:
+            results[i]["reason"] = "No room with enough capacity is free at this time"
+
+    return jsonify({
+        "status": "success",
+        "assignments": results,
+        "unassigned": sum(1 for r in results if r["room"] is None)
+    }), 200
+
 # --- Login route for verification ---
 @app.route("/login", methods=["POST"])
+@rate_limited()
 def login():
     data = request.get_json()
     emp_id = data.get("employee_id")
@@ -367,14 +731,17 @@ def login():
         "status": "success",
         "employee_id": emp_record["employee_id"],
         "name": emp_record["name"],
-        "is_admin": emp_record.get("is_admin", False)
+        "is_admin": emp_record.get("is_admin", False),
+        "site": emp_record.get("site") or DEFAULT_SITE
     }), 200
 
 
 @app.route("/invite", methods=["POST"])
+@idempotent
+@rate_limited()
 def invite_employees():
     data = request.get_json()
-    print("Invite payload received:", data)
+    applog.info("invite_received", booking_id=data.get("booking_id"), invitees=data.get("invitees"))
 
     booking_id = data.get("booking_id")
     invitees = data.get("invitees")  # List of employee_ids
@@ -386,13 +753,16 @@ def invite_employees():
         }), 400
 
     # Add each invitee with status "sent" into the invites array
-    result = bookings.update_one(
+    updated = bookings.find_one_and_update(
         {"_id": ObjectId(booking_id)},
-        {"$addToSet": {"invites": {"$each": [{"employee_id": emp_id, "status": "sent"} for emp_id in invitees]}}}
+        {"$addToSet": {"invites": {"$each": [{"employee_id": emp_id, "status": "sent"} for emp_id in invitees]}}},
+        projection={"embedding": 0},
+        return_document=ReturnDocument.AFTER
     )
 
-    if result.matched_count == 0:
+    if updated is None:
         return jsonify({"status": "fail", "reason": "Booking not found"}), 404
+    best_effort("change_feed", changes.record_change, "invite", "created", updated)
 
     return jsonify({
         "status": "success",
@@ -401,6 +771,7 @@ def invite_employees():
 
 # --- Route for employees to view all their received invites ---
 @app.route("/my_invites", methods=["POST"])
+@rate_limited()
 def get_invites():
     emp_id = request.json.get("employee_id")
     invites = []
@@ -414,7 +785,8 @@ def get_invites():
     for booking in matching_bookings:
         for invite in booking.get("invites", []):
             if invite.get("employee_id") == emp_id:
-                inviter_record = employees.find_one({"employee_id": booking["booked_by"]})
+                with stage("employee_lookup"):
+                    inviter_record = employees.find_one({"employee_id": booking["booked_by"]})
                 inviter_name = inviter_record["name"] if inviter_record else booking["booked_by"]
                 invite_copy = {
                     "booking_id": str(booking["_id"]),
@@ -427,11 +799,13 @@ def get_invites():
                 }
                 invites.append(invite_copy)
 
-    print(f"Invites fetched for {emp_id}: {invites}")
+    applog.info("invites_fetched", employee_id=emp_id, count=len(invites))
     return jsonify({"status": "success", "invites": invites}), 200
 
 # --- Route to update invite status for a booking ---
 @app.route("/respond_invite", methods=["POST"])
+@idempotent
+@rate_limited()
 def respond_invite():
     data = request.get_json()
     booking_id = data.get("booking_id")
@@ -441,31 +815,162 @@ def respond_invite():
     if not booking_id or not emp_id or not new_status:
         return jsonify({"status": "fail", "reason": "Missing fields"}), 400
 
-    result = bookings.update_one(
+    updated = bookings.find_one_and_update(
         {"_id": ObjectId(booking_id), "invites.employee_id": emp_id},
-        {"$set": {"invites.$.status": new_status}}
+        {"$set": {"invites.$.status": new_status}},
+        projection={"embedding": 0},
+        return_document=ReturnDocument.AFTER
     )
 
-    if result.matched_count == 0:
+    if updated is None:
         return jsonify({"status": "fail", "reason": "Invite not found"}), 404
+    best_effort("change_feed", changes.record_change, "invite", "updated", updated)
 
     return jsonify({"status": "success", "message": f"Invite for {emp_id} updated to {new_status}"}), 200
 
 
+# --- Route for delta sync: bookings and invites changed since the client's last token ---
+@app.route("/changes", methods=["GET"])
+@rate_limited()
+def get_changes():
+    emp_id = request.args.get("employee_id")
+    if not emp_id:
+        return jsonify({"status": "fail", "reason": "Missing employee_id"}), 400
+    since = request.args.get("since", type=int)
+    with stage("changes_query"):
+        feed = changes.changes_since(since, emp_id)
+    return jsonify({"status": "success", **feed}), 200
+
+
+# --- Everything the dashboard renders on load, in one response and without the LLM ---
+@app.route("/dashboard_state", methods=["GET"])
+@rate_limited()
+def dashboard_state():
+    emp_id = request.args.get("employee_id")
+    if not emp_id:
+        return jsonify({"status": "fail", "reason": "Missing employee_id"}), 400
+    today = datetime.now().date().isoformat()
+    fields = {"site": 1, "room": 1, "date": 1, "time": 1, "purpose": 1, "attendees": 1, "booked_by": 1, "invites": 1}
+
+    with stage("dashboard_queries"):
+        # The sync token is read first, so anything written during these queries is
+        # picked up again by the next /changes poll rather than missed
+        token = changes.current_token()
+        own = query_pool.submit(lambda: list(
+            bookings.find({"booked_by": emp_id, "date": {"$gte": today}}, fields).sort([("date", 1), ("start_min", 1)])
+        ))
+        invited = query_pool.submit(lambda: list(
+            bookings.find({"invites": {"$elemMatch": {"employee_id": emp_id}}, "date": {"$gte": today}}, fields)
+            .sort([("date", 1), ("start_min", 1)])
+        ))
+        own, invited = own.result(), invited.result()
+
+    invites = []
+    for b in invited:
+        status = next((i.get("status", "sent") for i in b.get("invites", []) if i.get("employee_id") == emp_id), "sent")
+        invites.append({
+            "booking_id": str(b["_id"]),
+            "site": b.get("site", DEFAULT_SITE),
+            "room": b["room"],
+            "date": b["date"],
+            "time": b["time"],
+            "purpose": b.get("purpose"),
+            "status": status,
+            "invited_by": b["booked_by"]
+        })
+    for b in own:
+        b["_id"] = str(b["_id"])
+        b.pop("booked_by", None)
+
+    # One directory lookup for every inviter and invitee on the page
+    people = {i["invited_by"] for i in invites} | {i.get("employee_id") for b in own for i in b.get("invites", [])}
+    with stage("employee_lookup"):
+        names = directory.names(people)
+    site = request_site()
+    room_list = [{k: v for k, v in r.items() if k != "updated_at"} for r in catalog.query(0, [], site)]
+
+    return jsonify({
+        "status": "success",
+        "employee_id": emp_id,
+        "bookings": own,
+        "invites": invites,
+        "names": names,
+        "site": site,
+        "rooms": room_list,
+        "sync_token": token
+    }), 200
+
+
+# --- Server-sent event stream of room occupancy for dashboards and wall displays ---
+@app.route("/room_status/stream", methods=["GET"])
+@rate_limited()
+def room_status_stream():
+    # Subscribe before reading the snapshot so no booking falls between the two
+    site = request_site()
+    q = room_events.subscribe(site)
+    now = datetime.now()
+    today = now.date().isoformat()
+    status = {name: {"occupied": False, "bookings": []} for name in catalog.names(site)}
+    with stage("overlap_scan"):
+        for b in bookings.find({"site": site_filter(site), "date": today}, {"room": 1, "date": 1, "time": 1}):
+            room_status = status.setdefault(b["room"], {"occupied": False, "bookings": []})
+            room_status["bookings"].append(b["time"])
+            try:
+                start, end = parse_time_range(b["date"], b["time"])
+            except Exception:
+                continue
+            if start <= now < end:
+                room_status["occupied"] = True
+
+    response = Response(stream_with_context(room_events.stream(q, {"site": site, "date": today, "rooms": status})),
+                        mimetype="text/event-stream")
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
+
+
 # --- Route to get all employees for dropdown population ---
 @app.route("/employees", methods=["GET"])
+@rate_limited()
 def get_employees():
-    employee_list = list(employees.find({}, {"_id": 0, "employee_id": 1, "name": 1}))
-    return jsonify({"employees": employee_list}), 200
+    employee_list, etag = directory.listing()
+    response = jsonify({"employees": employee_list})
+    # Clients revalidate every time; an unchanged directory costs a 304 with no body
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "no-cache"
+    return response.make_conditional(request)
+
+
+# --- Route for employee autocomplete: prefix match on ID, full name or any name part ---
+@app.route("/employees/search", methods=["GET"])
+@rate_limited()
+def search_employees():
+    try:
+        limit = min(max(int(request.args.get("limit", 20)), 1), 100)
+        offset = max(int(request.args.get("offset", 0)), 0)
+    except ValueError:
+        return jsonify({"status": "fail", "reason": "limit and offset must be integers"}), 400
+
+    with stage("directory_search"):
+        results, total = directory.search(request.args.get("q", ""), limit, offset)
+    next_offset = offset + len(results)
+    return jsonify({
+        "employees": results,
+        "total": total,
+        "next_offset": next_offset if next_offset < total else None
+    }), 200
 
 
 # --- Route to check if a room is available ---
 @app.route("/is_available", methods=["POST"])
+@rate_limited()
 def is_available():
     data = request.get_json()
     room = data.get("room")
     date = data.get("date")
     time = data.get("time")
+    if date and time:
+        date, time = normalize_slot(date, time)
 
     if not room or not date or not time:
         return jsonify({"status": "fail", "reason": "Missing room, date, or time"}), 400
@@ -478,16 +983,24 @@ def is_available():
             "reason": "Invalid time format. Use 'HH:MM AM/PM to HH:MM AM/PM' or 'HH:MM AM/PM - HH:MM AM/PM'."
         }), 400
 
-    existing_bookings = list(bookings.find({"room": room, "date": date}))
-    for b in existing_bookings:
-        try:
-            start, end = parse_time_range(b["date"], b["time"])
-            if times_overlap(desired_start, desired_end, start, end):
-                return jsonify({"status": "unavailable", "reason": "Room is already booked at this time"}), 200
-        except:
-            continue
+    with stage("overlap_scan"):
+        existing_bookings = list(bookings.find({"site": site_filter(request_site()), "room": room, "date": date}))
+        clash = find_clash(existing_bookings, desired_start, desired_end)
+    if clash:
+        return jsonify({"status": "unavailable", "reason": "Room is already booked at this time"}), 200
 
     return jsonify({"status": "available", "message": "Room is available at the selected time"}), 200
 
+def start_background_tasks():
+    # Index creation and the archiver thread belong to the serving process only, not to
+    # anything that imports this module; WSGI entry points call this after importing app.
+    # A failed index is logged rather than fatal; `python indexes.py verify` reports it too.
+    indexes.ensure_indexes(on_error=lambda name, keys, e: applog.error(
+        "index_create_failed", collection=name, keys=keys, error=str(e)))
+    archive.start_archiver()
+
 if __name__ == "__main__":
+    # The debug reloader runs this file twice: a watcher, then the child that serves
+    if os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        start_background_tasks()
     app.run(debug=True)
\ No newline at end of file
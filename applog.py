@@ -0,0 +1,121 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+from flask import g, request, has_request_context
+import metrics
+
+# Structured JSON logs. Callers only build a LogRecord and put it on a bounded queue; a
+# listener thread formats and writes it, so a slow stdout never holds up a request. When
+# the queue is full the line is dropped and counted. Every line carries the request ID
+# (taken from X-Request-ID or generated) and INFO lines are sampled per route.
+
+QUEUE_SIZE = 10000
+MAX_FIELD_CHARS = 2000
+MAX_LIST_ITEMS = 20
+# Fraction of requests whose INFO lines are kept, by endpoint; warnings and errors always are
+SAMPLE_RATES = {
+    "get_invites": 0.1,
+    "dashboard_state": 0.1,
+    "get_employees": 0.01,
+    "search_employees": 0.01,
+    "get_changes": 0.01,
+}
+
+_queue = queue.Queue(maxsize=QUEUE_SIZE)
+logger = logging.getLogger("sementor")
+logger.setLevel(logging.INFO)
+logger.propagate = False
+
+
+def _truncate(value):
+    if isinstance(value, str) and len(value) > MAX_FIELD_CHARS:
+        return f"{value[:MAX_FIELD_CHARS]}...(+{len(value) - MAX_FIELD_CHARS} chars)"
+    if isinstance(value, (list, tuple)):
+        items = [_truncate(v) for v in value[:MAX_LIST_ITEMS]]
+        if len(value) > MAX_LIST_ITEMS:
+            items.append(f"...(+{len(value) - MAX_LIST_ITEMS} items)")
+        return items
+    if isinstance(value, dict):
+        return {k: _truncate(v) for k, v in value.items()}
+    return value
+
+
+class JSONFormatter(logging.Formatter):
+    def format(self, record):
+        line = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname.lower(),
+            "event": record.getMessage(),
+        }
+        for key in ("request_id", "route"):
+            if getattr(record, key, None):
+                line[key] = getattr(record, key)
+        line.update(_truncate(getattr(record, "fields", {})))
+        return json.dumps(line, default=str)
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record):
+        # Formatting happens on the listener thread, not here
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            metrics.inc("sementor_log_dropped_total")
+
+
+def _log(level, event, fields):
+    request_id = route = None
+    if has_request_context():
+        if level < logging.WARNING and not g.get("log_sampled", True):
+            return
+        request_id = g.get("request_id")
+        route = request.endpoint
+    if logger.isEnabledFor(level):
+        logger.log(level, event, extra={"fields": fields, "request_id": request_id, "route": route})
+
+
+def info(event, **fields):
+    _log(logging.INFO, event, fields)
+
+
+def warning(event, **fields):
+    _log(logging.WARNING, event, fields)
+
+
+def error(event, **fields):
+    _log(logging.ERROR, event, fields)
+
+
+_writer = logging.StreamHandler(sys.stdout)
+_writer.setFormatter(JSONFormatter())
+_listener = logging.handlers.QueueListener(_queue, _writer)
+logger.addHandler(NonBlockingQueueHandler(_queue))
+_listener.start()
+atexit.register(_listener.stop)
+
+
+def init_app(app):
+    @app.before_request
+    def _assign_request_id():
+        g.request_id = request.headers.get("X-Request-ID", "")[:64] or uuid.uuid4().hex
+        g.log_sampled = random.random() < SAMPLE_RATES.get(request.endpoint, 1.0)
+        g.log_start = time.perf_counter()
+
+    @app.after_request
+    def _log_request(response):
+        response.headers["X-Request-ID"] = g.get("request_id", "")
+        fields = {"method": request.method, "path": request.path, "status": response.status_code}
+        if g.get("log_start") is not None:
+            fields["duration_ms"] = round((time.perf_counter() - g.log_start) * 1000, 2)
+        (warning if response.status_code >= 500 else info)("request", **fields)
+        return response
@@ -0,0 +1,74 @@
+import threading
+import time
+from datetime import date
+from pymongo import DESCENDING
+from pymongo.errors import BulkWriteError
+import metrics
+from db import bookings, bookings_archive
+from sites import site_filter
+
+# Hot/cold split: `bookings` only holds today's and future bookings, everything older is
+# moved to `bookings_archive`. Live routes keep querying `bookings`, so their working set
+# and index size follow upcoming bookings instead of total history; old data is read
+# through history() only.
+
+BATCH_SIZE = 1000
+ARCHIVE_INTERVAL = 6 * 60 * 60  # seconds between background runs
+
+
+def archive_past_bookings(cutoff=None):
+    cutoff = cutoff or date.today().isoformat()
+    moved = 0
+    while True:
+        batch = list(bookings.find({"date": {"$lt": cutoff}}).limit(BATCH_SIZE))
+        if not batch:
+            break
+        try:
+            bookings_archive.insert_many(batch, ordered=False)
+        except BulkWriteError as e:
+            # A previous run may have archived some of these before it was interrupted
+            if any(err["code"] != 11000 for err in e.details["writeErrors"]):
+                raise
+        bookings.delete_many({"_id": {"$in": [b["_id"] for b in batch]}})
+        moved += len(batch)
+    metrics.inc("sementor_archived_bookings_total", moved)
+    return moved
+
+
+def start_archiver(interval=ARCHIVE_INTERVAL):
+    def run():
+        while True:
+            try:
+                archive_past_bookings()
+            except Exception:
+                metrics.inc("sementor_archive_errors_total")
+            time.sleep(interval)
+
+    threading.Thread(target=run, name="booking-archiver", daemon=True).start()
+
+
+def history(employee_id=None, room=None, date_from=None, date_to=None, limit=50, skip=0, site=None):
+    query = {}
+    if employee_id:
+        query["booked_by"] = employee_id
+    if site or room:
+        # Room names are only unique within a site
+        query["site"] = site_filter(site)
+    if room:
+        query["room"] = room
+    date_range = {"$lt": date.today().isoformat()}
+    if date_from:
+        date_range["$gte"] = date_from
+    if date_to:
+        date_range["$lte"] = date_to
+    query["date"] = date_range
+
+    # Past bookings the archiver has not moved yet are still in the hot collection
+    recent = list(bookings.find(query, {"embedding": 0}).sort("date", DESCENDING).limit(skip + limit))
+    archived = list(bookings_archive.find(query, {"embedding": 0}).sort("date", DESCENDING).limit(skip + limit))
+    merged = sorted(recent + archived, key=lambda b: b["date"], reverse=True)
+    return merged[skip:skip + limit]
+
+
+if __name__ == "__main__":
+    print(f"Archived {archive_past_bookings()} past bookings")
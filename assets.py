@@ -0,0 +1,145 @@
+import gzip
+import hashlib
+import os
+import re
+from flask import Response, abort, request
+
+try:
+    import brotli
+except ImportError:  # optional: without it only gzip variants are built
+    brotli = None
+
+# Static asset pipeline. At startup every stylesheet is minified, renamed after a hash of
+# its content and compressed once with gzip (and brotli when installed); the frontend pages
+# are rewritten to point at the hashed names. Hashed files never change, so they are served
+# as immutable for a year; pages are small and revalidated with an ETag. Larger JSON API
+# responses are compressed on the fly with the same encoding negotiation.
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+STYLESHEETS = ["css/styles.css"]
+PAGES_DIR = "frontend"
+STATIC_PREFIX = "/assets/"  # Flask reserves /static/ for its own static folder
+JSON_COMPRESS_MIN_BYTES = 1024
+
+_assets = {}    # served path -> {"type", "cache", "etag", "variants": {encoding: bytes}}
+_manifest = {}  # source path -> hashed URL
+
+
+def minify_css(text):
+    # Drops comments (keeping /*! licence headers) and the whitespace a browser ignores
+    text = re.sub(r"/\*(?!!).*?\*/", "", text, flags=re.S)
+    text = re.sub(r"\s+", " ", text)
+    text = re.sub(r"\s*([{};,])\s*", r"\1", text)
+    text = re.sub(r":\s+", ":", text)
+    text = text.replace(";}", "}")
+    return text.strip()
+
+
+def compress(body, encoding, static=True):
+    if encoding == "br":
+        return brotli.compress(body, quality=11 if static else 4)
+    return gzip.compress(body, compresslevel=9 if static else 6, mtime=0)
+
+
+def _add(path, body, mimetype, cache):
+    variants = {"identity": body}
+    for encoding in ("br", "gzip") if brotli else ("gzip",):
+        packed = compress(body, encoding)
+        if len(packed) < len(body):
+            variants[encoding] = packed
+    _assets[path] = {
+        "type": mimetype,
+        "cache": cache,
+        "etag": hashlib.sha256(body).hexdigest()[:16],
+        "variants": variants,
+    }
+
+
+def build():
+    _assets.clear()
+    _manifest.clear()
+    for source in STYLESHEETS:
+        with open(os.path.join(ROOT, source), encoding="utf-8") as f:
+            body = minify_css(f.read()).encode()
+        name, ext = os.path.splitext(os.path.basename(source))
+        url = f"{STATIC_PREFIX}{name}.{hashlib.sha256(body).hexdigest()[:10]}{ext}"
+        _add(url, body, "text/css", "public, max-age=31536000, immutable")
+        _manifest[source] = url
+
+    pages = os.path.join(ROOT, PAGES_DIR)
+    for filename in sorted(os.listdir(pages)):
+        if not filename.endswith(".html"):
+            continue
+        with open(os.path.join(pages, filename), encoding="utf-8") as f:
+            html = f.read()
+        for source, url in _manifest.items():
+            html = html.replace(f'"{source}"', f'"{url}"')
+        _add(f"/{filename}", html.encode(), "text/html", "no-cache")
+    if "/index.html" in _assets:
+        _assets["/"] = _assets["/index.html"]
+
+
+def negotiate(available):
+    # Best encoding the client accepts among those we have; q=0 excludes an encoding
+    accepted = {}
+    for part in request.headers.get("Accept-Encoding", "").split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        if params.strip().startswith("q="):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name.strip().lower()] = q
+    for encoding in ("br", "gzip"):
+        if encoding in available and accepted.get(encoding, accepted.get("*", 0)) > 0:
+            return encoding
+    return "identity"
+
+
+def serve(path):
+    asset = _assets.get(path)
+    if asset is None:
+        abort(404)
+    encoding = negotiate(asset["variants"])
+    response = Response(asset["variants"][encoding], mimetype=asset["type"])
+    if encoding != "identity":
+        response.headers["Content-Encoding"] = encoding
+    response.headers["Vary"] = "Accept-Encoding"
+    response.headers["Cache-Control"] = asset["cache"]
+    response.set_etag(f"{asset['etag']}-{encoding}")
+    return response.make_conditional(request)
+
+
+def init_app(app):
+    build()
+
+    @app.route("/", methods=["GET"])
+    @app.route("/<page>.html", methods=["GET"])
+    def frontend_page(page="index"):
+        return serve("/" if page == "index" else f"/{page}.html")
+
+    @app.route(f"{STATIC_PREFIX}<path:name>", methods=["GET"])
+    def static_asset(name):
+        return serve(f"{STATIC_PREFIX}{name}")
+
+    @app.after_request
+    def _compress_json(response):
+        if (response.mimetype != "application/json" or response.direct_passthrough
+                or "Content-Encoding" in response.headers or response.status_code < 200
+                or response.status_code in (204, 304)):
+            return response
+        body = response.get_data()
+        if len(body) < JSON_COMPRESS_MIN_BYTES:
+            return response
+        encoding = negotiate(("br", "gzip") if brotli else ("gzip",))
+        if encoding == "identity":
+            return response
+        response.set_data(compress(body, encoding, static=False))
+        response.headers["Content-Encoding"] = encoding
+        response.vary.add("Accept-Encoding")
+        # The compressed body differs byte-for-byte, so a strong ETag must not carry over
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        return response
@@ -0,0 +1,94 @@
+from collections import Counter
+from intent import classify_intent, INTENT_EXAMPLES, LOCAL_INTENTS
+
+# Accuracy of the intent classifier on utterances it was not built from. The frontend
+# appends "My ID is EMPxxxx." to every prompt, so the held-out set does too. A None label
+# sends the request to the full prompt, which is slower but still correct; a wrong local
+# label (view, invite) is answered without the LLM and is the error that matters most.
+
+HELD_OUT = {
+    "book": [
+        "Grab me a room for three at 4 PM today for a retro",
+        "Book a room for 8 people on Thursday 11 to 12 for the quarterly review",
+        "Can I get Data Dome tomorrow morning for a workshop",
+        "Set up a meeting for 5 in Brainstorm Hub next Friday at 3",
+        "Reserve a room for my one-on-one with my manager at 10:30",
+        "I want to book Pinnacle on 2025-07-02 from 1 PM to 2 PM",
+        "Find and book a free room for 4 this afternoon",
+        "Block a room for the onboarding session on Monday 9 AM",
+    ],
+    "cancel": [
+        "Cancel my 3pm booking tomorrow",
+        "Cancel all my bookings next week",
+        "Drop the Data Dome reservation I made for Friday",
+        "We don't need the room for the retro anymore",
+        "Please remove my booking on 2025-07-02",
+        "Cancel the meeting room I booked for Monday morning",
+        "Free up my Pinnacle slot at 10 AM",
+        "Undo my booking for tomorrow",
+    ],
+    "view": [
+        "What have I booked this week",
+        "Show all my reservations",
+        "Do I have any rooms booked tomorrow",
+        "List my meeting room bookings",
+        "What bookings do I have",
+        "Which rooms did I reserve",
+        "Give me my upcoming room bookings",
+        "Display my reservations",
+    ],
+    "availability": [
+        "Is Brainstorm Hub free at 2 PM tomorrow",
+        "Any rooms open on Friday between 10 and 11",
+        "What's available for 6 people this afternoon",
+        "Check if Data Dome is free on 2025-07-02 at 9",
+        "Are there rooms free next Tuesday morning",
+        "Which rooms can I use at 4 PM today",
+        "Is there a free room right now",
+        "Show me free rooms for tomorrow 1 to 2",
+    ],
+    "invite": [
+        "Invite EMP1003 to my 3pm meeting",
+        "Add Priya to tomorrow's design review",
+        "Send invites for my Friday booking to the team",
+        "Please invite EMP1007 and EMP1008 to my booking",
+        "Include Rahul in my Data Dome meeting",
+        "Can you add my manager to the retro",
+        "Share the sprint planning booking with EMP1010",
+        "Invite the QA team to my 10 AM meeting",
+    ],
+}
+
+SUFFIX = " My ID is EMP1001."
+
+
+if __name__ == "__main__":
+    training = {text for examples in INTENT_EXAMPLES.values() for text in examples}
+    assert not training & {text for texts in HELD_OUT.values() for text in texts}, "held-out overlaps the examples"
+
+    outcomes = Counter()
+    per_intent = {}
+    wrong_local = []
+    for expected, texts in HELD_OUT.items():
+        correct = 0
+        for text in texts:
+            label, score = classify_intent(text + SUFFIX)
+            if label == expected:
+                correct += 1
+                outcomes["correct"] += 1
+            elif label is None:
+                outcomes["full prompt"] += 1
+            else:
+                outcomes["wrong"] += 1
+                if label in LOCAL_INTENTS:
+                    wrong_local.append((expected, label, score, text))
+        per_intent[expected] = (correct, len(texts))
+
+    total = sum(outcomes.values())
+    for intent, (correct, count) in per_intent.items():
+        print(f"{intent:<13} {correct}/{count}")
+    print(f"accuracy {outcomes['correct'] / total:.1%}  full prompt {outcomes['full prompt'] / total:.1%}  "
+          f"wrong {outcomes['wrong'] / total:.1%}")
+    print(f"wrong labels answered without the LLM: {len(wrong_local)}")
+    for expected, label, score, text in wrong_local:
+        print(f"  {expected} -> {label} ({score:.2f}): {text}")
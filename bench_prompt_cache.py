@@ -0,0 +1,36 @@
+import statistics
+from utils import ollama_generate
+from prompts import system_prompt, OLLAMA_MODEL
+
+# Compares prompt evaluation cost of the old single-template prompt (instructions and
+# schema re-sent with every utterance) against the system-prompt split used by /assistant.
+# Requires a running Ollama server with OLLAMA_MODEL pulled.
+
+utterances = [
+    "Book Data Dome for 4 people tomorrow from 2:00 PM to 3:00 PM for sprint planning. My ID is EMP1001.",
+    "Show me my bookings. My ID is EMP1003.",
+    "Cancel my booking in Brainstorm Hub on 2025-06-20 from 10:00 AM to 11:00 AM. EMP1002",
+    "Is any room free on 2025-06-21 from 1:00 PM to 2:00 PM?",
+    "Reserve Pinnacle for 2 people next Monday 9:00 AM - 9:30 AM for a 1:1. ID EMP1004",
+]
+
+
+def run(label, build):
+    prompt_tokens, prompt_ms, total_ms = [], [], []
+    for text in utterances:
+        prompt, system = build(text)
+        data = ollama_generate(prompt, system=system, model=OLLAMA_MODEL)
+        prompt_tokens.append(data.get("prompt_eval_count", 0))
+        prompt_ms.append(data.get("prompt_eval_duration", 0) / 1e6)
+        total_ms.append(data.get("total_duration", 0) / 1e6)
+    print(f"{label:<14} prompt_eval_tokens={statistics.mean(prompt_tokens):7.1f} "
+          f"prompt_eval_ms={statistics.mean(prompt_ms):8.1f} total_ms={statistics.mean(total_ms):8.1f}")
+
+
+if __name__ == "__main__":
+    # Warm the model once so load time is not counted against either variant
+    ollama_generate("ping", model=OLLAMA_MODEL)
+    # Before: the user utterance sat in the middle of the template, ahead of the schema,
+    # so nothing after it could be reused from the previous request.
+    run("single prompt", lambda text: (system_prompt.replace("Respond only with a JSON object", f"User: {text}\nRespond only with a JSON object", 1), None))
+    run("system prompt", lambda text: (f"User: {text}", system_prompt))
@@ -0,0 +1,57 @@
+import random
+import time
+from datetime import datetime, timedelta
+from scheduler import assign_rooms
+from models import ROOM_CAPACITY
+
+# Scaling check for the batch room assignment: random meeting requests over one working
+# day (extra rooms added for the larger batches), verifying that no room is double booked
+# or over capacity and reporting runtime and fill rate.
+
+DAY = datetime(2025, 6, 20, 8, 0)
+
+
+def make_requests(n, seed=0):
+    rng = random.Random(seed)
+    requests = []
+    for i in range(n):
+        start = DAY + timedelta(minutes=30 * rng.randrange(0, 20))
+        end = start + timedelta(minutes=30 * rng.choice((1, 2, 2, 3, 4)))
+        requests.append({"id": i, "start": start, "end": end, "attendees": rng.choice((1, 2, 2, 3, 4, 5, 6))})
+    return requests
+
+
+def make_rooms(n):
+    rooms = dict(ROOM_CAPACITY)
+    for i in range(n // 8):
+        rooms[f"Room {i}"] = random.Random(i).choice((2, 4, 6, 8, 12))
+    return rooms
+
+
+def check(requests, rooms, assignments):
+    by_id = {r["id"]: r for r in requests}
+    per_room = {}
+    for req_id, room in assignments.items():
+        if room is None:
+            continue
+        req = by_id[req_id]
+        assert req["attendees"] <= rooms[room], "over capacity"
+        per_room.setdefault(room, []).append((req["start"], req["end"]))
+    for intervals in per_room.values():
+        intervals.sort()
+        for (_, prev_end), (start, _) in zip(intervals, intervals[1:]):
+            assert prev_end <= start, "double booked"
+
+
+if __name__ == "__main__":
+    for n in (100, 1000, 5000, 10000):
+        requests, rooms = make_requests(n), make_rooms(n)
+        start = time.perf_counter()
+        assignments = assign_rooms(requests, rooms)
+        elapsed = time.perf_counter() - start
+        check(requests, rooms, assignments)
+
+        assigned = [r for r in requests if assignments[r["id"]]]
+        fill = sum(r["attendees"] / rooms[assignments[r["id"]]] for r in assigned) / max(len(assigned), 1)
+        print(f"{n:6d} requests  {len(rooms):5d} rooms  {elapsed * 1000:8.1f} ms  "
+              f"assigned {len(assigned):6d}  avg fill {fill:.0%}")
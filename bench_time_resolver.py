@@ -0,0 +1,51 @@
+import itertools
+import time
+from time_utils import resolve_date, resolve_time_range, _resolve_date, _resolve_time_range
+
+# Throughput of the local date/time resolver over a few thousand generated expressions,
+# first with a cold cache and then with every expression already memoized.
+
+dates = (
+    ["today", "tomorrow", "day after tomorrow", "next week", "in 3 days", "in 2 weeks"]
+    + [f"{prefix}{day}" for prefix in ("", "next ", "this ") for day in ("monday", "tuesday", "wednesday", "thursday", "friday")]
+    + [f"2025-{m:02d}-{d:02d}" for m in range(1, 13) for d in (1, 10, 20, 28)]
+    + [f"{d}/{m:02d}/2025" for m in range(1, 13) for d in (5, 15, 25)]
+    + [f"{month} {d}" for month in ("jan", "june", "September", "Dec") for d in (1, 9, 17, 30)]
+)
+
+
+def clock_styles(hour, minute):
+    h12 = hour % 12 or 12
+    meridiem = "am" if hour < 12 else "pm"
+    return [f"{h12}:{minute:02d} {meridiem.upper()}", f"{h12}{meridiem}" if not minute else f"{h12}:{minute:02d}{meridiem}", f"{hour}:{minute:02d}"]
+
+
+slots = [(h, m) for h in range(8, 19) for m in (0, 30)]
+starts = ["9", "9:30", "10am", "11 AM", "1pm", "2", "2:15 PM", "14:00", "16:30"]
+times = (
+    [f"{s}{sep}{e}" for (s_slot, e_slot) in itertools.combinations(slots, 2)
+     for s, e in zip(clock_styles(*s_slot), clock_styles(*e_slot)) for sep in ("-", " to ")]
+    + [f"{s} for {d}" for s in starts for d in ("1 hour", "90 minutes", "half an hour", "2 hrs")]
+    + [f"at {s}" for s in starts]
+    + [f"2025-06-20T{h:02d}:{m:02d}" for h in range(8, 19) for m in (0, 30)]
+)
+
+
+def bench(label, fn, values, rounds):
+    start = time.perf_counter()
+    resolved = 0
+    for _ in range(rounds):
+        for value in values:
+            resolved += fn(value) is not None
+    elapsed = time.perf_counter() - start
+    calls = rounds * len(values)
+    print(f"{label:<18} {calls:6d} calls  {elapsed * 1e6 / calls:6.2f} us/call  resolved {resolved / rounds:.0f}/{len(values)}")
+
+
+if __name__ == "__main__":
+    _resolve_date.cache_clear()
+    _resolve_time_range.cache_clear()
+    bench("dates (cold)", resolve_date, dates, 1)
+    bench("dates (warm)", resolve_date, dates, 20)
+    bench("times (cold)", resolve_time_range, times, 1)
+    bench("times (warm)", resolve_time_range, times, 20)
@@ -0,0 +1,67 @@
+import time
+from datetime import datetime, timezone
+from pymongo import ASCENDING, ReturnDocument
+from db import counters, changes
+
+# Change feed for delta sync. Every booking/invite write appends a document with the next
+# value of a global sequence and the employees it concerns; a client keeps the last seq it
+# has seen and asks only for newer entries touching its employee. Entries expire after
+# RETENTION (TTL index), and a client whose token is older than that is told to refetch.
+
+RETENTION = 7 * 24 * 60 * 60
+# Sequence numbers are allocated before the insert, so a lower seq can become visible just
+# after a higher one. Entries younger than this are held back so no client skips past them.
+SETTLE_SECONDS = 2
+
+
+def _next_seq():
+    doc = counters.find_one_and_update(
+        {"_id": "changes"}, {"$inc": {"seq": 1}}, upsert=True, return_document=ReturnDocument.AFTER
+    )
+    return doc["seq"]
+
+
+def snapshot(booking):
+    doc = {k: v for k, v in booking.items() if k != "embedding"}
+    if "_id" in doc:
+        doc["_id"] = str(doc["_id"])
+    return doc
+
+
+def record_change(kind, op, booking):
+    # kind: "booking" or "invite"; op: "created", "updated" or "cancelled"
+    employee_ids = {booking.get("booked_by")} | {i.get("employee_id") for i in booking.get("invites", [])}
+    changes.insert_one({
+        "seq": _next_seq(),
+        "ts": datetime.now(timezone.utc),
+        "kind": kind,
+        "op": op,
+        "booking_id": str(booking.get("_id")),
+        "employees": sorted(e for e in employee_ids if e),
+        "booking": snapshot(booking)
+    })
+
+
+def changes_since(since, employee_id, limit=500):
+    # No token yet, or one older than the retained history: the client has to do a full
+    # fetch and continue from the current position
+    oldest = changes.find_one({}, {"seq": 1}, sort=[("seq", ASCENDING)])
+    if since is None or (oldest is not None and oldest["seq"] > since + 1):
+        return {"changes": [], "next": current_token(), "has_more": False, "reset": True}
+
+    settled = datetime.fromtimestamp(time.time() - SETTLE_SECONDS, timezone.utc)
+    entries = list(changes.find(
+        {"employees": employee_id, "seq": {"$gt": since}, "ts": {"$lte": settled}},
+        {"_id": 0, "employees": 0}
+    ).sort("seq", ASCENDING).limit(limit))
+    return {
+        "changes": entries,
+        "next": entries[-1]["seq"] if entries else since,
+        "has_more": len(entries) == limit,
+        "reset": False
+    }
+
+
+def current_token():
+    doc = counters.find_one({"_id": "changes"})
+    return doc["seq"] if doc else 0
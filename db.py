@@ -3,4 +3,9 @@ from pymongo import MongoClient
 client = MongoClient("mongodb://localhost:27017")
 db = client["meeting_rooms"]
 bookings = db["bookings"]
-employees = db["employees"]
\ No newline at end of file
+employees = db["employees"]
+bookings_archive = db["bookings_archive"]
+rooms = db["rooms"]
+room_usage = db["room_usage"]
+changes = db["changes"]
+counters = db["counters"]
\ No newline at end of file
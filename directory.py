@@ -0,0 +1,96 @@
+import hashlib
+import threading
+import time
+from bisect import bisect_left
+from db import employees
+
+# In-memory employee directory for /employees and /employees/search. Employee IDs, full
+# names and each name token are kept in one sorted key array, so a prefix query is two
+# bisects plus the matching slice. The collection is re-read when its count, newest _id
+# or newest updated_at changes (checked every REFRESH_INTERVAL seconds), and in full every
+# FULL_RELOAD_INTERVAL to pick up edits that touch none of those.
+
+REFRESH_INTERVAL = 30
+FULL_RELOAD_INTERVAL = 10 * 60
+
+
+class EmployeeDirectory:
+    def __init__(self, collection):
+        self.collection = collection
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._fingerprint = None
+        self._checked_at = 0.0
+        self._loaded_at = 0.0
+
+    def _fetch_fingerprint(self):
+        newest = self.collection.find_one({}, {"_id": 1}, sort=[("_id", -1)])
+        updated = self.collection.find_one({"updated_at": {"$exists": True}}, {"updated_at": 1}, sort=[("updated_at", -1)])
+        return (
+            self.collection.estimated_document_count(),
+            newest["_id"] if newest else None,
+            updated["updated_at"] if updated else None,
+        )
+
+    def _build(self):
+        people = sorted(
+            self.collection.find({}, {"_id": 0, "employee_id": 1, "name": 1}),
+            key=lambda e: (e.get("name") or "", e.get("employee_id") or "")
+        )
+        entries = set()
+        for i, emp in enumerate(people):
+            name = (emp.get("name") or "").lower()
+            for key in {(emp.get("employee_id") or "").lower(), name, *name.split()}:
+                if key:
+                    entries.add((key, i))
+        entries = sorted(entries)
+        listing = [{"employee_id": e.get("employee_id"), "name": e.get("name")} for e in people]
+        etag = hashlib.sha1(repr(listing).encode()).hexdigest()
+        return {
+            "people": people,
+            "names": {e.get("employee_id"): e.get("name") for e in people},
+            "listing": listing,
+            "keys": [k for k, _ in entries],
+            "positions": [i for _, i in entries],
+            "etag": etag,
+        }
+
+    def _current(self):
+        now = time.monotonic()
+        if self._snapshot is None or now - self._checked_at > REFRESH_INTERVAL:
+            with self._lock:
+                now = time.monotonic()
+                if self._snapshot is None or now - self._checked_at > REFRESH_INTERVAL:
+                    self._checked_at = now
+                    fingerprint = self._fetch_fingerprint()
+                    if (self._snapshot is None or fingerprint != self._fingerprint
+                            or now - self._loaded_at > FULL_RELOAD_INTERVAL):
+                        self._snapshot = self._build()
+                        self._fingerprint = fingerprint
+                        self._loaded_at = now
+        return self._snapshot
+
+    def listing(self):
+        snapshot = self._current()
+        return snapshot["listing"], snapshot["etag"]
+
+    def names(self, employee_ids):
+        known = self._current()["names"]
+        return {e: known[e] for e in employee_ids if e in known}
+
+    def search(self, query, limit=20, offset=0):
+        snapshot = self._current()
+        prefix = query.strip().lower()
+        if not prefix:
+            matches = range(len(snapshot["people"]))
+        else:
+            keys = snapshot["keys"]
+            lo = bisect_left(keys, prefix)
+            hi = bisect_left(keys, prefix + "\uffff")
+            # Results come back in name order; a person matching on several keys appears once
+            matches = sorted(set(snapshot["positions"][lo:hi]))
+        page = [snapshot["listing"][i] for i in matches[offset:offset + limit]]
+        return page, len(matches)
+
+
+directory = EmployeeDirectory(employees)
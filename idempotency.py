@@ -0,0 +1,68 @@
+import hashlib
+import threading
+from functools import wraps
+from flask import request, jsonify, make_response, Response
+import metrics
+from cache import TTLCache
+
+# Responses of mutating routes, keyed by (endpoint, Idempotency-Key). A retry with the same
+# key gets the stored response back without re-running the LLM or touching Mongo; a retry
+# that arrives while the original is still running waits for it instead of running twice.
+_responses = TTLCache(maxsize=10000, ttl=24 * 60 * 60)
+_in_flight = {}
+_lock = threading.Lock()
+
+WAIT_TIMEOUT = 60  # seconds a duplicate waits for the original request
+
+
+def _replay(stored, fingerprint):
+    if stored["fingerprint"] != fingerprint:
+        return jsonify({
+            "status": "fail",
+            "reason": "Idempotency-Key was already used with a different request body"
+        }), 422
+    metrics.inc("sementor_idempotent_replays_total", route=request.endpoint)
+    response = Response(stored["body"], status=stored["status"], mimetype=stored["mimetype"])
+    response.headers["Idempotent-Replayed"] = "true"
+    return response
+
+
+def idempotent(view):
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        key = request.headers.get("Idempotency-Key")
+        if not key:
+            return view(*args, **kwargs)
+
+        cache_key = (request.endpoint, key)
+        fingerprint = hashlib.sha256(request.get_data()).hexdigest()
+        while True:
+            with _lock:
+                stored = _responses.get(cache_key)
+                event = _in_flight.get(cache_key)
+                owner = stored is None and event is None
+                if owner:
+                    event = _in_flight[cache_key] = threading.Event()
+            if stored is not None:
+                return _replay(stored, fingerprint)
+            if owner:
+                break
+            if not event.wait(WAIT_TIMEOUT):
+                return jsonify({"status": "fail", "reason": "Original request is still in progress"}), 409
+            # Original finished: loop to replay it, or take over if it was not stored (5xx)
+
+        try:
+            response = make_response(view(*args, **kwargs))
+            # Server errors and rate-limit rejections are not stored so the client can retry them
+            if response.status_code < 500 and response.status_code != 429:
+                _responses.set(cache_key, {
+                    "fingerprint": fingerprint,
+                    "body": response.get_data(),
+                    "status": response.status_code,
+                    "mimetype": response.mimetype
+                })
+        finally:
+            with _lock:
+                _in_flight.pop(cache_key).set()
+        return response
+    return wrapper
@@ -0,0 +1,158 @@
+import sys
+from datetime import datetime, timezone
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import OperationFailure
+from db import db
+from sites import DEFAULT_SITE, site_filter
+
+# Every index the app relies on, per collection: (keys, options). ensure_indexes() runs at
+# startup; `python indexes.py verify` also explains the hot queries below and fails if any
+# of them would scan a whole collection. Room and date lookups lead with `site`, so each
+# office reads only its own part of the index.
+
+INDEXES = {
+    "bookings": [
+        ([("site", ASCENDING), ("room", ASCENDING), ("date", ASCENDING)], {}),
+        ([("site", ASCENDING), ("date", ASCENDING)], {}),
+        ([("booked_by", ASCENDING), ("date", ASCENDING), ("start_min", ASCENDING)], {}),
+        ([("invites.employee_id", ASCENDING), ("date", ASCENDING), ("start_min", ASCENDING)], {}),
+        ([("date", ASCENDING)], {}),
+        ([("cancel_op.token", ASCENDING)], {"sparse": True}),
+    ],
+    "bookings_archive": [
+        ([("booked_by", ASCENDING), ("date", DESCENDING)], {}),
+        ([("site", ASCENDING), ("room", ASCENDING), ("date", DESCENDING)], {}),
+        ([("date", DESCENDING)], {}),
+    ],
+    "employees": [
+        ([("employee_id", ASCENDING)], {"unique": True}),
+        ([("updated_at", DESCENDING)], {}),
+    ],
+    "rooms": [
+        ([("site", ASCENDING), ("name", ASCENDING)], {"unique": True}),
+        ([("updated_at", DESCENDING)], {}),
+    ],
+    "changes": [
+        ([("seq", ASCENDING)], {"unique": True}),
+        ([("employees", ASCENDING), ("seq", ASCENDING)], {}),
+        ([("ts", ASCENDING)], {"expireAfterSeconds": 7 * 24 * 60 * 60}),
+    ],
+    "room_usage": [
+        ([("site", ASCENDING), ("date", ASCENDING), ("room", ASCENDING), ("department", ASCENDING), ("hour", ASCENDING)],
+         {"unique": True}),
+    ],
+}
+
+# Indexes replaced by the ones above, which ensure_indexes() drops. The unique ones would
+# reject the same room name at two sites; the rest are prefixes of a start_min-sorted index.
+RETIRED_INDEXES = {
+    "bookings": ["room_1_date_1", "booked_by_1_date_1", "invites.employee_id_1"],
+    "bookings_archive": ["room_1_date_-1"],
+    "rooms": ["name_1"],
+    "room_usage": ["date_1_room_1_department_1_hour_1"],
+}
+
+# (collection, filter, projection, sort) as the routes issue them, with representative values
+_HQ = site_filter(DEFAULT_SITE)
+_CLAIM = {"$or": [{"cancel_op": {"$exists": False}}, {"cancel_op.at": {"$lt": datetime(2025, 6, 20, tzinfo=timezone.utc)}}]}
+_AT_3PM = {"$or": [{"start_min": 900}, {"start_min": {"$exists": False}, "time": {"$regex": "^0?3:00\\s*PM", "$options": "i"}}]}
+_SLOTS = {"room": 1, "date": 1, "time": 1}
+_DASHBOARD = {"site": 1, "room": 1, "date": 1, "time": 1, "purpose": 1, "attendees": 1, "booked_by": 1, "invites": 1}
+_BY_START = [("date", ASCENDING), ("start_min", ASCENDING)]
+HOT_QUERIES = [
+    ("bookings", {"site": _HQ, "room": "Data Dome", "date": "2025-06-20"}, None, None),  # overlap checks, /is_available
+    ("bookings", {"booked_by": "EMP1001"}, {"embedding": 0}, None),                      # view intent
+    ("bookings", {"booked_by": "EMP1001", "date": {"$gte": "2025-06-20"}}, _DASHBOARD, _BY_START),  # /dashboard_state
+    ("bookings", {"invites": {"$elemMatch": {"employee_id": "EMP1001"}}, "date": {"$gte": "2025-06-20"}},
+     _DASHBOARD, _BY_START),                                                                # /dashboard_state invites
+    ("bookings", {"invites": {"$elemMatch": {"employee_id": "EMP1001"}}}, {"embedding": 0}, None),  # /my_invites
+    ("bookings", {"$and": [{"booked_by": "EMP1001", "_id": {"$in": [ObjectId("6655f0c2a1b2c3d4e5f60718")]}}, _CLAIM]},
+     None, None),                                                                           # /cancel by booking_ids
+    ("bookings", {"$and": [{"booked_by": "EMP1001", "date": {"$gte": "2025-06-23", "$lte": "2025-06-29"},
+                            "room": "Data Dome", "site": _HQ, **_AT_3PM}, _CLAIM]}, None, None),  # range cancel
+    ("bookings", {"$and": [{"site": _HQ, "room": "Data Dome", "date": {"$gte": "2025-06-20", "$lte": "2025-06-20"}},
+                           _CLAIM]}, None, None),                                         # admin range cancel
+    ("bookings", {"cancel_op.token": "0f3c9a"}, {"embedding": 0, "cancel_op": 0}, None),  # cancel read and delete
+    ("bookings", {"site": _HQ, "date": "2025-06-20"}, _SLOTS, None),                      # availability intent, room status
+    ("bookings", {"site": _HQ, "date": {"$in": ["2025-06-20", "2025-06-21"]}}, _SLOTS, None),  # room auto-assignment
+    ("bookings", {"date": {"$lt": "2025-06-20"}}, None, None),                            # archiver
+    ("bookings", {"booked_by": "EMP1001", "date": {"$lt": "2025-06-20"}}, {"embedding": 0}, [("date", DESCENDING)]),  # /history
+    ("bookings_archive", {"booked_by": "EMP1001", "date": {"$lt": "2025-06-20"}}, {"embedding": 0},
+     [("date", DESCENDING)]),                                                               # /history
+    ("employees", {"employee_id": "EMP1001"}, None, None),                               # ID checks, /login
+    ("employees", {"employee_id": {"$in": ["EMP1001", "EMP1002"]}}, {"employee_id": 1, "department": 1}, None),  # cancel departments
+    ("employees", {"updated_at": {"$exists": True}}, {"updated_at": 1}, [("updated_at", DESCENDING)]),  # directory refresh
+    ("rooms", {}, {"updated_at": 1}, [("updated_at", DESCENDING)]),                      # catalog refresh
+    ("changes", {"employees": "EMP1001", "seq": {"$gt": 0}, "ts": {"$lte": datetime(2025, 6, 20, tzinfo=timezone.utc)}},
+     {"_id": 0, "employees": 0}, [("seq", ASCENDING)]),                                    # /changes
+    ("room_usage", {"site": _HQ, "date": {"$gte": "2025-06-01", "$lte": "2025-06-30"}}, {"_id": 0}, None),  # /utilization
+]
+
+
+def ensure_indexes(*names, on_error=None):
+    # Creating an existing index is a no-op, so this is safe on every start. A failing index
+    # (e.g. duplicate employee_ids blocking the unique one) raises, or with on_error is
+    # reported as on_error(collection, keys, exc) and the remaining indexes are still built
+    for name in names or INDEXES:
+        existing = db[name].index_information()
+        for retired in RETIRED_INDEXES.get(name, []):
+            if retired in existing:
+                db[name].drop_index(retired)
+        for keys, options in INDEXES[name]:
+            try:
+                db[name].create_index(keys, **options)
+            except OperationFailure as e:
+                if on_error is None:
+                    raise
+                on_error(name, keys, e)
+
+
+def missing_indexes():
+    missing = []
+    for name, specs in INDEXES.items():
+        existing = {tuple((k, v) for k, v in info["key"]) for info in db[name].index_information().values()}
+        for keys, _ in specs:
+            if tuple(keys) not in existing:
+                missing.append((name, keys))
+    return missing
+
+
+def _stages(plan):
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            yield plan["stage"]
+        for value in plan.values():
+            yield from _stages(value)
+    elif isinstance(plan, list):
+        for item in plan:
+            yield from _stages(item)
+
+
+def collection_scans():
+    scans = []
+    for name, query, projection, sort in HOT_QUERIES:
+        cursor = db[name].find(query, projection)
+        if sort:
+            cursor = cursor.sort(sort)
+        winning = cursor.explain()["queryPlanner"]["winningPlan"]
+        if "COLLSCAN" in set(_stages(winning)):
+            scans.append((name, query))
+    return scans
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "create"
+    try:
+        ensure_indexes()
+    except OperationFailure as e:
+        # e.g. duplicate employee_ids blocking the unique index
+        print(f"Index creation failed: {e}")
+        sys.exit(1)
+    if command == "verify":
+        problems = [f"missing index {name} {keys}" for name, keys in missing_indexes()]
+        problems += [f"COLLSCAN on {name} {query}" for name, query in collection_scans()]
+        for problem in problems:
+            print(problem)
+        sys.exit(1 if problems else 0)
+    print("Indexes are in place")
@@ -0,0 +1,109 @@
+import threading
+import time
+from contextlib import contextmanager
+from flask import g, request, has_request_context, Response
+
+# Histogram buckets in seconds – wide enough to cover both Mongo lookups and LLM calls
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+TOKEN_BUCKETS = (8, 16, 32, 64, 128, 256, 512, 1024, 2048, 4096)
+
+_lock = threading.Lock()
+_histograms = {}  # (name, labels) -> [buckets, bucket_counts, sum, count]
+_counters = {}    # (name, labels) -> value
+
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+
+def observe(name, value, buckets=BUCKETS, **labels):
+    key = _key(name, labels)
+    with _lock:
+        hist = _histograms.get(key)
+        if hist is None:
+            hist = _histograms[key] = [buckets, [0] * len(buckets), 0.0, 0]
+        for i, bound in enumerate(hist[0]):
+            if value <= bound:
+                hist[1][i] += 1
+        hist[2] += value
+        hist[3] += 1
+
+
+def inc(name, amount=1, **labels):
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + amount
+
+
+@contextmanager
+def stage(name):
+    # Times one step of a request (LLM call, Mongo query, ...) and records it
+    # both in the stage histogram and in the per-request Server-Timing list.
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        observe("sementor_stage_duration_seconds", elapsed, stage=name)
+        if has_request_context():
+            timings = g.setdefault("stage_timings", {})
+            timings[name] = timings.get(name, 0.0) + elapsed
+
+
+def _format_labels(labels, extra=None):
+    items = list(labels) + (list(extra.items()) if extra else [])
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in items) + "}"
+
+
+def render():
+    lines = []
+    with _lock:
+        histograms = {k: (v[0], list(v[1]), v[2], v[3]) for k, v in _histograms.items()}
+        counters = dict(_counters)
+
+    seen = set()
+    for (name, labels), value in sorted(counters.items()):
+        if name not in seen:
+            lines.append(f"# TYPE {name} counter")
+            seen.add(name)
+        lines.append(f"{name}{_format_labels(labels)} {value}")
+
+    for (name, labels), (bounds, buckets, total, count) in sorted(histograms.items()):
+        if name not in seen:
+            lines.append(f"# TYPE {name} histogram")
+            seen.add(name)
+        for bound, bucket_count in zip(bounds, buckets):
+            lines.append(f"{name}_bucket{_format_labels(labels, {'le': bound})} {bucket_count}")
+        lines.append(f"{name}_bucket{_format_labels(labels, {'le': '+Inf'})} {count}")
+        lines.append(f"{name}_sum{_format_labels(labels)} {total}")
+        lines.append(f"{name}_count{_format_labels(labels)} {count}")
+    return "\n".join(lines) + "\n"
+
+
+def init_app(app):
+    @app.before_request
+    def _start_timer():
+        g.request_start = time.perf_counter()
+
+    @app.after_request
+    def _record_request(response):
+        start = g.get("request_start")
+        if start is None:
+            return response
+        elapsed = time.perf_counter() - start
+        route = request.endpoint or "unknown"
+        observe("sementor_request_duration_seconds", elapsed, route=route, method=request.method)
+        inc("sementor_requests_total", route=route, method=request.method, status=response.status_code)
+
+        # Server-Timing lets the browser devtools show the per-stage breakdown
+        entries = [f"{name};dur={secs * 1000:.2f}" for name, secs in g.get("stage_timings", {}).items()]
+        entries.append(f"total;dur={elapsed * 1000:.2f}")
+        response.headers["Server-Timing"] = ", ".join(entries)
+        response.headers["Timing-Allow-Origin"] = "*"
+        return response
+
+    @app.route("/metrics", methods=["GET"])
+    def metrics():
+        return Response(render(), mimetype="text/plain; version=0.0.4")
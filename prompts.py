@@ -0,0 +1,86 @@
+import json
+from functools import lru_cache
+from typing import Optional
+from pydantic import BaseModel
+
+# Extraction schema and prompts for the /assistant LLM calls. Kept apart from app4 so
+# benchmarks and tools can build the same prompts without starting the app.
+
+class BookingDetails(BaseModel):
+    room: Optional[str] = None
+    attendees: Optional[int] = None
+    date: Optional[str] = None
+    time: Optional[str] = None
+    purpose: Optional[str] = None
+    employee_id: Optional[str] = None
+    intent: str = "book"
+
+# Static instructions are sent once as the system prompt so Ollama can reuse the
+# evaluated prefix across calls; only the user utterance changes per request.
+system_prompt_template = """
+You are a helpful office assistant. Extract the following from the user's input and respond with only a JSON object matching the specified format:
+{field_list}
+Respond ONLY with a **valid JSON object**. DO NOT add extra explanation, markdown, or bullet points.
+Respond only with a JSON object containing values for these fields, formatted as valid JSON:
+{format_instructions}
+"""
+
+field_descriptions = {
+    "room": "Room name (use 'any' if the user does not mind which room)",
+    "attendees": "Number of people",
+    "date": "Date, copied exactly as the user wrote it (e.g. 'tomorrow', 'next Monday', '2025-06-20')",
+    "time": "Time slot, copied exactly as the user wrote it (e.g. '2pm-3pm', '14:00 to 15:00', '10am for 1 hour')",
+    "purpose": "Purpose",
+    "employee_id": "Employee ID",
+    "intent": 'Intent: one of "book", "cancel", "view"',
+}
+
+field_labels = {
+    "room": "room name",
+    "attendees": "number of attendees",
+    "date": "date",
+    "time": "time slot",
+    "purpose": "purpose of the meeting",
+    "employee_id": "employee ID",
+}
+
+# Fields the LLM has to extract once the intent is known; the full list is used when the
+# classifier is unsure and the LLM also has to decide the intent.
+intent_fields = {
+    None: ["room", "attendees", "date", "time", "purpose", "employee_id", "intent"],
+    "book": ["room", "attendees", "date", "time", "purpose", "employee_id"],
+    "cancel": ["room", "date", "time", "employee_id"],
+    "view": ["employee_id"],
+    "availability": ["date", "time"],
+}
+
+# Extracted when mentioned but not asked for: without a room a cancel covers every room in the dates
+optional_fields = {
+    "cancel": {"room"},
+}
+
+# Also optional when the request is for several bookings ("all my bookings next week")
+bulk_optional_fields = {
+    "cancel": {"time"},
+}
+
+@lru_cache(maxsize=64)
+def build_llm_request(fields):
+    # Decoding is constrained to this (sub)schema, so the reply is bare JSON
+    properties = BookingDetails.schema()["properties"]
+    schema = {
+        "type": "object",
+        "properties": {f: properties[f] for f in fields},
+        "required": list(fields)
+    }
+    system = system_prompt_template.format(
+        field_list="\n".join(f"- {field_descriptions[f]}" for f in fields),
+        format_instructions=json.dumps(schema)
+    )
+    return system, schema
+
+system_prompt = build_llm_request(tuple(intent_fields[None]))[0]
+
+OLLAMA_MODEL = "llama3.2"  # ensure model name matches your pulled model
+# A filled-in object is well under 100 tokens, the cap only stops runaway generations.
+llm_options = {"num_predict": 160, "temperature": 0}
@@ -0,0 +1,137 @@
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+from functools import wraps
+from flask import request, jsonify
+import metrics
+
+# Token-bucket budgets per employee: (tokens refilled per second, bucket size). LLM-backed
+# routes get a small budget so one client cannot starve everyone else of model capacity;
+# cheap lookups like /is_available get a generous one.
+BUDGETS = {
+    "llm": (10 / 60, 5),
+    "default": (2.0, 30),
+}
+# Budgets per client address. Everyone behind an office NAT or proxy shares one address, so
+# these are sized for a few dozen people and only stop a single host flooding the app.
+# request.remote_addr is the proxy itself unless the app is wrapped in werkzeug's ProxyFix.
+IP_BUDGETS = {
+    "llm": (300 / 60, 100),
+    "default": (40.0, 600),
+}
+
+_EMP_ID = re.compile(r"\b(?:EMP|ADMIN)\d{4}\b")
+# A bucket idle long enough to be full again is the same as no bucket at all
+IDLE_AFTER = max(burst / rate for rate, burst in [*BUDGETS.values(), *IP_BUDGETS.values()])
+PRUNE_EVERY = 10000
+
+
+class MemoryStore:
+    # Per-process buckets; fastest option when the app runs as a single worker
+
+    def __init__(self):
+        self._buckets = {}  # key -> (tokens, last_refill)
+        self._lock = threading.Lock()
+        self._calls = 0
+
+    def take(self, key, rate, burst):
+        now = time.monotonic()
+        with self._lock:
+            tokens, last = self._buckets.get(key, (burst, now))
+            tokens = min(burst, tokens + (now - last) * rate)
+            if tokens >= 1:
+                self._buckets[key] = (tokens - 1, now)
+                wait = 0.0
+            else:
+                self._buckets[key] = (tokens, now)
+                wait = (1 - tokens) / rate
+            self._calls += 1
+            if self._calls % PRUNE_EVERY == 0:
+                self._prune(now)
+        return wait
+
+    def _prune(self, now):
+        for key in [k for k, (_, last) in self._buckets.items() if now - last > IDLE_AFTER]:
+            del self._buckets[key]
+
+
+class SQLiteStore:
+    # Buckets in a local SQLite file so several workers on one host share the same budget
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._calls = 0
+        self._conn().execute(
+            "CREATE TABLE IF NOT EXISTS buckets (key TEXT PRIMARY KEY, tokens REAL, last REAL)"
+        )
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(self.path, isolation_level=None, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")
+        return conn
+
+    def take(self, key, rate, burst):
+        conn = self._conn()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT tokens, last FROM buckets WHERE key = ?", (key,)).fetchone()
+            tokens, last = row if row else (burst, now)
+            tokens = min(burst, tokens + max(0.0, now - last) * rate)
+            wait = 0.0 if tokens >= 1 else (1 - tokens) / rate
+            if tokens >= 1:
+                tokens -= 1
+            conn.execute("INSERT OR REPLACE INTO buckets (key, tokens, last) VALUES (?, ?, ?)", (key, tokens, now))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        # Each worker counts its own calls; any of them pruning keeps the shared table bounded
+        self._calls += 1
+        if self._calls % PRUNE_EVERY == 0:
+            conn.execute("DELETE FROM buckets WHERE last < ?", (now - IDLE_AFTER,))
+        return wait
+
+
+# RATE_LIMIT_DB=/path/to/ratelimit.db shares buckets across worker processes
+store = SQLiteStore(os.environ["RATE_LIMIT_DB"]) if os.environ.get("RATE_LIMIT_DB") else MemoryStore()
+
+
+def _client_buckets(budget):
+    # (key, rate, burst) for each bucket the request draws from
+    buckets = [(f"{budget}:ip:{request.remote_addr}", *IP_BUDGETS[budget])]
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        data = {}
+    # GET routes such as /dashboard_state and /changes take the ID in the query string
+    emp_id = data.get("employee_id") or data.get("booked_by") or request.args.get("employee_id")
+    if not emp_id and isinstance(data.get("prompt"), str):
+        match = _EMP_ID.search(data["prompt"])
+        emp_id = match.group(0) if match else None
+    if isinstance(emp_id, str) and emp_id:
+        buckets.append((f"{budget}:emp:{emp_id}", *BUDGETS[budget]))
+    return buckets
+
+
+def rate_limited(budget="default"):
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            # The request must fit both the employee's and the client address's budget
+            wait = max(store.take(key, rate, burst) for key, rate, burst in _client_buckets(budget))
+            if wait > 0:
+                metrics.inc("sementor_rate_limited_total", route=request.endpoint, budget=budget)
+                response = jsonify({"status": "fail", "reason": "Too many requests. Please try again later."})
+                response.status_code = 429
+                response.headers["Retry-After"] = str(math.ceil(wait))
+                return response
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
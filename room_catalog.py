@@ -0,0 +1,102 @@
+import threading
+import time
+from bisect import bisect_left
+from db import rooms
+from models import ROOM_CAPACITY
+from sites import DEFAULT_SITE, site_of
+
+# In-memory view of the `rooms` collection ({site, name, capacity, floor, equipment, updated_at}),
+# kept per site, sorted by capacity with an equipment index, so "capacity >= N with a
+# projector" is a bisect plus a set lookup within one office. The collection is re-read when its document count or latest
+# updated_at changes, checked at most every REFRESH_INTERVAL seconds.
+
+REFRESH_INTERVAL = 30
+
+
+class RoomCatalog:
+    def __init__(self, collection):
+        self.collection = collection
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._fingerprint = None
+        self._checked_at = 0.0
+
+    def _fetch_fingerprint(self):
+        latest = self.collection.find_one({}, {"updated_at": 1}, sort=[("updated_at", -1)])
+        return self.collection.count_documents({}), latest.get("updated_at") if latest else None
+
+    def _build(self, docs):
+        if not docs:
+            # Empty collection: fall back to the built-in room list
+            docs = [{"site": DEFAULT_SITE, "name": name, "capacity": capacity, "floor": None, "equipment": []}
+                    for name, capacity in ROOM_CAPACITY.items()]
+        by_site = {}
+        for doc in docs:
+            by_site.setdefault(site_of(doc), []).append(dict(doc, site=site_of(doc)))
+        return {site: self._build_site(site_docs) for site, site_docs in by_site.items()}
+
+    def _build_site(self, docs):
+        ordered = sorted(docs, key=lambda d: (d["capacity"], d["name"]))
+        by_equipment = {}
+        for doc in ordered:
+            for item in doc.get("equipment") or []:
+                by_equipment.setdefault(item.lower(), set()).add(doc["name"])
+        return {
+            "rooms": ordered,
+            "capacities": [d["capacity"] for d in ordered],
+            "by_name": {d["name"]: d for d in ordered},
+            "by_equipment": by_equipment,
+        }
+
+    def reload(self):
+        with self._lock:
+            self._fingerprint = self._fetch_fingerprint()
+            self._snapshot = self._build(list(self.collection.find({}, {"_id": 0})))
+            self._checked_at = time.monotonic()
+
+    def _current(self):
+        if self._snapshot is None or time.monotonic() - self._checked_at > REFRESH_INTERVAL:
+            with self._lock:
+                if self._snapshot is None or time.monotonic() - self._checked_at > REFRESH_INTERVAL:
+                    self._checked_at = time.monotonic()
+                    fingerprint = self._fetch_fingerprint()
+                    if fingerprint != self._fingerprint or self._snapshot is None:
+                        self._snapshot = self._build(list(self.collection.find({}, {"_id": 0})))
+                        self._fingerprint = fingerprint
+        return self._snapshot
+
+    _EMPTY = {"rooms": [], "capacities": [], "by_name": {}, "by_equipment": {}}
+
+    def _site(self, site):
+        return self._current().get(site or DEFAULT_SITE, self._EMPTY)
+
+    def sites(self):
+        return sorted(self._current())
+
+    def get(self, name, site=DEFAULT_SITE):
+        return self._site(site)["by_name"].get(name)
+
+    def capacity(self, name, site=DEFAULT_SITE):
+        room = self.get(name, site)
+        return room["capacity"] if room else 0
+
+    def names(self, site=DEFAULT_SITE):
+        return [d["name"] for d in self._site(site)["rooms"]]
+
+    def capacities(self, site=DEFAULT_SITE):
+        return {d["name"]: d["capacity"] for d in self._site(site)["rooms"]}
+
+    def query(self, min_capacity=0, equipment=(), site=DEFAULT_SITE):
+        snapshot = self._site(site)
+        matches = snapshot["rooms"][bisect_left(snapshot["capacities"], min_capacity):]
+        for item in equipment:
+            allowed = snapshot["by_equipment"].get(item.lower(), set())
+            matches = [d for d in matches if d["name"] in allowed]
+        return matches
+
+
+catalog = RoomCatalog(rooms)
+
+
+def is_valid_room(room, attendees, site=DEFAULT_SITE):
+    return catalog.capacity(room, site) >= attendees
@@ -0,0 +1,73 @@
+import json
+import queue
+import threading
+from sites import DEFAULT_SITE, site_of
+
+# Server-sent events for room occupancy. Booking writes call publish() once; every
+# connected dashboard or wall display has its own bounded queue fed from that single
+# fan-out, so displays stop polling /is_available. Subscriptions are per site, so a
+# display only hears about its own office. Events are per process: run the stream
+# on a single worker or put a shared broker in front when scaling out.
+
+KEEPALIVE_SECONDS = 15
+QUEUE_SIZE = 100
+
+_subscribers = {}  # site -> set of queues
+_lock = threading.Lock()
+
+
+def subscribe(site=DEFAULT_SITE):
+    q = queue.Queue(maxsize=QUEUE_SIZE)
+    with _lock:
+        _subscribers.setdefault(site, set()).add(q)
+    return q
+
+
+def unsubscribe(q):
+    with _lock:
+        for queues in _subscribers.values():
+            queues.discard(q)
+
+
+def publish(op, booking):
+    site = site_of(booking)
+    event = {
+        "op": op,  # "booked" or "freed"
+        "site": site,
+        "room": booking.get("room"),
+        "date": booking.get("date"),
+        "time": booking.get("time"),
+        "booking_id": str(booking.get("_id")),
+    }
+    message = format_event("room_status", event)
+    with _lock:
+        subscribers = list(_subscribers.get(site, ()))
+    for q in subscribers:
+        try:
+            q.put_nowait(message)
+        except queue.Full:
+            # A client this far behind is dropped; it reconnects and gets a fresh snapshot
+            unsubscribe(q)
+            with q.mutex:
+                q.queue.clear()
+            q.put_nowait(None)
+
+
+def format_event(name, data):
+    return f"event: {name}\ndata: {json.dumps(data)}\n\n"
+
+
+def stream(q, snapshot):
+    try:
+        yield format_event("snapshot", snapshot)
+        while True:
+            try:
+                message = q.get(timeout=KEEPALIVE_SECONDS)
+            except queue.Empty:
+                yield ": keepalive\n\n"
+                continue
+            if message is None:
+                return
+            yield message
+    finally:
+        unsubscribe(q)
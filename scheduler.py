@@ -0,0 +1,60 @@
+from bisect import bisect_left, bisect_right
+from models import ROOM_CAPACITY
+
+# Room auto-assignment. Requests are processed in start-time order and each one goes to the
+# smallest free room that fits it (best fit), so small meetings land in Pinnacle and the big
+# rooms stay open for the groups that need them. Each room keeps its booked intervals sorted
+# and non-overlapping, so a free check is one bisect.
+
+ANY_ROOM = {"any", "any room", "anyroom", "auto"}
+
+
+def is_any_room(room):
+    return isinstance(room, str) and room.strip().lower() in ANY_ROOM
+
+
+class RoomTimeline:
+    def __init__(self):
+        self.starts = []
+        self.ends = []
+
+    def is_free(self, start, end):
+        # Only the last interval starting before `end` can overlap [start, end)
+        i = bisect_left(self.starts, end)
+        return i == 0 or self.ends[i - 1] <= start
+
+    def add(self, start, end):
+        # Merge with any intervals it overlaps so starts and ends both stay sorted
+        lo = bisect_right(self.ends, start)
+        hi = bisect_left(self.starts, end)
+        if lo < hi:
+            start = min(start, self.starts[lo])
+            end = max(end, self.ends[hi - 1])
+        self.starts[lo:hi] = [start]
+        self.ends[lo:hi] = [end]
+
+
+def assign_rooms(requests, rooms=None, existing=()):
+    # requests: dicts with "id", "start", "end" (datetimes) and "attendees"
+    # existing: (room, start, end) tuples already booked
+    rooms = ROOM_CAPACITY if rooms is None else rooms
+    by_capacity = sorted(rooms.items(), key=lambda item: (item[1], item[0]))
+    capacities = [capacity for _, capacity in by_capacity]
+    timelines = {room: RoomTimeline() for room in rooms}
+    for room, start, end in existing:
+        if room in timelines:
+            timelines[room].add(start, end)
+
+    assignments = {}
+    for req in sorted(requests, key=lambda r: (r["start"], -r["attendees"])):
+        assignments[req["id"]] = None
+        for room, _ in by_capacity[bisect_left(capacities, req["attendees"]):]:
+            if timelines[room].is_free(req["start"], req["end"]):
+                timelines[room].add(req["start"], req["end"])
+                assignments[req["id"]] = room
+                break
+    return assignments
+
+
+def pick_room(attendees, start, end, existing=(), rooms=None):
+    return assign_rooms([{"id": 0, "start": start, "end": end, "attendees": attendees}], rooms, existing)[0]
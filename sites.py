@@ -0,0 +1,17 @@
+import os
+
+# Offices are partitions: rooms, bookings, usage counters and room events all carry a
+# `site`, and every room/date query leads with it so it stays on that site's slice of the
+# site-prefixed indexes. Documents written before sites existed have no `site` field and
+# belong to DEFAULT_SITE, which is why its filter also matches a missing value.
+
+DEFAULT_SITE = os.environ.get("DEFAULT_SITE", "HQ")
+
+
+def site_of(doc):
+    return (doc or {}).get("site") or DEFAULT_SITE
+
+
+def site_filter(site):
+    site = site or DEFAULT_SITE
+    return {"$in": [site, None]} if site == DEFAULT_SITE else site
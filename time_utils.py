@@ -0,0 +1,244 @@
+import re
+from datetime import date, datetime, time, timedelta
+from functools import lru_cache
+
+# Local resolver for the date and time expressions users type ("tomorrow", "next Monday",
+# "2pm-3pm", "14:00 to 15:30", "10am for 90 minutes", ISO values). All lookups are memoized,
+# so repeated expressions – and re-parsing stored bookings during overlap scans – are cheap.
+
+WEEKDAYS = {
+    "monday": 0, "mon": 0, "tuesday": 1, "tue": 1, "tues": 1, "wednesday": 2, "wed": 2,
+    "thursday": 3, "thu": 3, "thurs": 3, "friday": 4, "fri": 4, "saturday": 5, "sat": 5,
+    "sunday": 6, "sun": 6,
+}
+MONTHS = {
+    "january": 1, "jan": 1, "february": 2, "feb": 2, "march": 3, "mar": 3, "april": 4, "apr": 4,
+    "may": 5, "june": 6, "jun": 6, "july": 7, "jul": 7, "august": 8, "aug": 8,
+    "september": 9, "sep": 9, "sept": 9, "october": 10, "oct": 10, "november": 11, "nov": 11,
+    "december": 12, "dec": 12,
+}
+
+_ISO_DATE = re.compile(r"(\d{4})-(\d{1,2})-(\d{1,2})")
+_NUMERIC_DATE = re.compile(r"(\d{1,2})[/.](\d{1,2})[/.](\d{4})")
+_IN_N = re.compile(r"in (\d+) (day|days|week|weeks)")
+_WEEKDAY = re.compile(r"(?:(next|this|coming) )?([a-z]+)")
+_MONTH_DAY = re.compile(r"([a-z]+)\.? (\d{1,2})(?:st|nd|rd|th)?(?:,? (\d{4}))?")
+_DAY_MONTH = re.compile(r"(\d{1,2})(?:st|nd|rd|th)? (?:of )?([a-z]+)\.?(?:,? (\d{4}))?")
+
+_T = r"(\d{1,2})(?:[:.](\d{2}))?\s*(am|pm)?"
+_RANGE = re.compile(rf"(?:from |between |at )?{_T}\s*(?:-|to|until|till|and)\s*{_T}")
+_DURATION = re.compile(rf"(?:from |at )?{_T}\s*(?:for )?(an?|half an|\d+(?:\.\d+)?)\s*(hours?|hrs?|h|minutes?|mins?|m)")
+_SINGLE = re.compile(rf"(?:from |at )?{_T}")
+_DATE_SPAN = re.compile(r"(?:from |between )?(.+?) (?:to|until|till|through|and|-) (.+)")
+_ISO_DATETIME = re.compile(r"\d{4}-\d{1,2}-\d{1,2}[t ](\d{1,2}):(\d{2})(?::\d{2}(?:\.\d+)?)?")
+_NOON = re.compile(r"\b(?:12\s*)?noon\b")
+_MIDNIGHT = re.compile(r"\b(?:12\s*)?midnight\b")
+# Slots are same-day, so a range ending at midnight ends at the last minute of the day
+END_OF_DAY = time(23, 59)
+
+
+def times_overlap(start1, end1, start2, end2):
+    return max(start1, start2) < min(end1, end2)
+
+
+def resolve_date(text, today=None):
+    if not text or not isinstance(text, str):
+        return None
+    return _resolve_date(" ".join(text.lower().split()).strip(" .,"), today or date.today())
+
+
+@lru_cache(maxsize=4096)
+def _resolve_date(text, today):
+    try:
+        m = _ISO_DATE.match(text)
+        if m:
+            return date(int(m.group(1)), int(m.group(2)), int(m.group(3))).isoformat()
+        m = _NUMERIC_DATE.fullmatch(text)
+        if m:  # day first, e.g. 20/06/2025
+            return date(int(m.group(3)), int(m.group(2)), int(m.group(1))).isoformat()
+    except ValueError:
+        return None
+
+    if text in ("today", "tonight", "this afternoon", "this morning", "this evening"):
+        return today.isoformat()
+    if text in ("day after tomorrow", "the day after tomorrow"):
+        return (today + timedelta(days=2)).isoformat()
+    if text == "tomorrow":
+        return (today + timedelta(days=1)).isoformat()
+    if text == "next week":
+        return (today + timedelta(days=7)).isoformat()
+
+    m = _IN_N.fullmatch(text)
+    if m:
+        days = int(m.group(1)) * (7 if m.group(2).startswith("week") else 1)
+        return (today + timedelta(days=days)).isoformat()
+
+    m = _WEEKDAY.fullmatch(text)
+    if m and m.group(2) in WEEKDAYS:
+        days_ahead = (WEEKDAYS[m.group(2)] - today.weekday()) % 7
+        if m.group(1) == "next" and days_ahead == 0:
+            days_ahead = 7
+        return (today + timedelta(days=days_ahead)).isoformat()
+
+    m = _MONTH_DAY.fullmatch(text)
+    if m and m.group(1) in MONTHS:
+        return _month_day(MONTHS[m.group(1)], int(m.group(2)), m.group(3), today)
+    m = _DAY_MONTH.fullmatch(text)
+    if m and m.group(2) in MONTHS:
+        return _month_day(MONTHS[m.group(2)], int(m.group(1)), m.group(3), today)
+    return None
+
+
+def _month_day(month, day, year, today):
+    try:
+        if year:
+            return date(int(year), month, day).isoformat()
+        # No year given: the next occurrence of that day
+        resolved = date(today.year, month, day)
+        if resolved < today:
+            resolved = date(today.year + 1, month, day)
+        return resolved.isoformat()
+    except ValueError:
+        return None
+
+
+def resolve_date_range(text, today=None):
+    # (first, last) ISO dates, inclusive, for "this week", "next month", "june 20 to june 24"
+    # or any single date resolve_date understands
+    if not text or not isinstance(text, str):
+        return None
+    return _resolve_date_range(" ".join(text.lower().split()).strip(" .,"), today or date.today())
+
+
+@lru_cache(maxsize=1024)
+def _resolve_date_range(text, today):
+    # "in" is filler in "in the next week" but part of "in 3 days"
+    text = re.sub(r"^(?:all of |for |during |in (?!\d+ (?:day|week)))?(?:the )?", "", text)
+    if text in ("this week", "the rest of this week", "rest of the week"):
+        return today.isoformat(), (today + timedelta(days=6 - today.weekday())).isoformat()
+    if text == "next week":
+        monday = today + timedelta(days=7 - today.weekday())
+        return monday.isoformat(), (monday + timedelta(days=6)).isoformat()
+    if text in ("this month", "next month"):
+        first = today.replace(day=1)
+        if text == "next month":
+            first = (first + timedelta(days=32)).replace(day=1)
+        last = (first + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+        return max(first, today).isoformat(), last.isoformat()
+
+    m = _DATE_SPAN.fullmatch(text)
+    if m:
+        start, end = resolve_date(m.group(1), today), resolve_date(m.group(2), today)
+        if start and end and start <= end:
+            return start, end
+    single = resolve_date(text, today)
+    return (single, single) if single else None
+
+
+def resolve_time_range(text):
+    if not text or not isinstance(text, str):
+        return None
+    text = " ".join(text.lower().split())
+    text = text.replace("–", "-").replace("—", "-").replace("a.m.", "am").replace("p.m.", "pm")
+    text = _MIDNIGHT.sub("12:00 am", _NOON.sub("12:00 pm", text))
+    return _resolve_time_range(text.strip(" ."))
+
+
+def _to_time(hour, minute, meridiem):
+    hour, minute = int(hour), int(minute or 0)
+    if minute > 59:
+        return None
+    if meridiem:
+        if not 1 <= hour <= 12:
+            return None
+        hour = hour % 12 + (12 if meridiem == "pm" else 0)
+    elif hour > 23:
+        return None
+    return time(hour, minute)
+
+
+def _guess_meridiem(hour):
+    # Bare "2" or "2-3" in an office context means the afternoon
+    if 1 <= int(hour) <= 7:
+        return "pm"
+    return None
+
+
+@lru_cache(maxsize=4096)
+def _resolve_time_range(text):
+    m = _ISO_DATETIME.fullmatch(text)
+    if m:
+        start = _to_time(m.group(1), m.group(2), None)
+        end = start and _add(start, timedelta(hours=1))
+        return (start, end) if end else None
+
+    m = _RANGE.fullmatch(text)
+    if m:
+        h1, m1, p1, h2, m2, p2 = m.groups()
+        if p2 and not p1 and int(h1) <= 12:
+            # "10 to 11am", "11-1pm": borrow the end meridiem unless that puts start after end
+            p1 = p2
+            if _to_time(h1, m1, p1) and _to_time(h2, m2, p2) and _to_time(h1, m1, p1) >= _to_time(h2, m2, p2):
+                p1 = "am" if p2 == "pm" else "pm"
+        elif not p1 and not p2 and int(h1) <= 12 and int(h2) <= 12:
+            p1 = _guess_meridiem(h1)
+            p2 = _guess_meridiem(h2) or (p1 if int(h2) < 12 and int(h2) > int(h1) else None)
+        start, end = _to_time(h1, m1, p1), _to_time(h2, m2, p2)
+        if end == time(0, 0):
+            end = END_OF_DAY
+        if start and end and start < end:
+            return start, end
+        return None
+
+    m = _DURATION.fullmatch(text)
+    if m:
+        h, mi, p, amount, unit = m.groups()
+        start = _to_time(h, mi, p or (None if int(h) > 12 else _guess_meridiem(h)))
+        if not start:
+            return None
+        amount = {"a": 1, "an": 1, "half an": 0.5}.get(amount) or float(amount)
+        delta = timedelta(hours=amount) if unit.startswith("h") else timedelta(minutes=amount)
+        end = _add(start, delta)
+        return (start, end) if end and start < end else None
+
+    m = _SINGLE.fullmatch(text)
+    if m:
+        h, mi, p = m.groups()
+        start = _to_time(h, mi, p or (None if int(h) > 12 else _guess_meridiem(h)))
+        if not start:
+            return None
+        # A bare start time books the default one-hour slot
+        end = _add(start, timedelta(hours=1))
+        return (start, end) if end else None
+    return None
+
+
+def _add(start, delta):
+    end = datetime.combine(date.min, start) + delta
+    if end.date() != date.min:
+        return None  # runs past midnight
+    return end.time()
+
+
+def format_time(t):
+    return f"{t.hour % 12 or 12}:{t.strftime('%M %p')}"
+
+
+def format_time_range(start, end):
+    return f"{format_time(start)} to {format_time(end)}"
+
+
+def normalize_slot(date_str, time_range):
+    # Canonical YYYY-MM-DD and "H:MM AM to H:MM PM"; unrecognized values are passed through
+    resolved_date = resolve_date(date_str) or date_str
+    span = resolve_time_range(time_range)
+    return resolved_date, format_time_range(*span) if span else time_range
+
+
+@lru_cache(maxsize=8192)
+def parse_time_range(date_str, time_range):
+    day = datetime.strptime(date_str, "%Y-%m-%d").date()
+    span = resolve_time_range(time_range)
+    if span is None:
+        raise ValueError(f"Unrecognized time range: {time_range!r}")
+    return datetime.combine(day, span[0]), datetime.combine(day, span[1])
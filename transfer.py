@@ -0,0 +1,181 @@
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from bson import ObjectId, json_util
+from bson.json_util import JSONOptions, JSONMode, CANONICAL_JSON_OPTIONS, RELAXED_JSON_OPTIONS
+from pymongo.errors import BulkWriteError
+from db import db
+
+# Streaming import/export of collections as NDJSON (one Extended JSON document per line).
+# Import also accepts mongoexport --jsonArray files such as meeting_rooms.bookings.json.
+# Memory stays constant: documents are read and written one batch at a time, and a
+# checkpoint file records progress so an interrupted run can resume.
+#
+#   python transfer.py export bookings bookings.ndjson --embeddings skip
+#   python transfer.py import bookings meeting_rooms.bookings.json --checkpoint import.ckpt
+
+DECODE_OPTIONS = JSONOptions(json_mode=JSONMode.RELAXED, tz_aware=False)
+CHUNK_SIZE = 1 << 16
+
+
+def iter_documents(f):
+    # Yields documents from NDJSON or from a top-level JSON array without loading the file
+    decoder = json.JSONDecoder(object_hook=lambda d: json_util.object_hook(d, DECODE_OPTIONS))
+    buf, pos, eof = "", 0, False
+    while True:
+        while pos < len(buf) and buf[pos] in " \t\r\n,[]":
+            pos += 1
+        if pos >= len(buf):
+            if eof:
+                return
+            buf, pos = f.read(CHUNK_SIZE), 0
+            eof = not buf
+            continue
+        try:
+            doc, end = decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            # Object continues past the buffer: read more and retry
+            chunk = f.read(CHUNK_SIZE)
+            buf, pos, eof = buf[pos:] + chunk, 0, not chunk
+            continue
+        yield doc
+        pos = end
+
+
+def read_checkpoint(path):
+    if path and os.path.exists(path):
+        with open(path) as f:
+            return json_util.loads(f.read())
+    return None
+
+
+def write_checkpoint(path, value):
+    if path:
+        with open(path + ".tmp", "w") as f:
+            f.write(json_util.dumps(value))
+        os.replace(path + ".tmp", path)
+
+
+class Progress:
+    def __init__(self, label):
+        self.label = label
+        self.count = 0
+        self.start = time.perf_counter()
+
+    def add(self, n):
+        self.count += n
+        elapsed = time.perf_counter() - self.start
+        print(f"\r{self.label}: {self.count} docs, {self.count / max(elapsed, 1e-9):,.0f} docs/s", end="", file=sys.stderr)
+
+    def done(self):
+        print(file=sys.stderr)
+
+
+def apply_embeddings(batch, mode):
+    if mode == "skip":
+        for doc in batch:
+            doc.pop("embedding", None)
+    elif mode == "recompute":
+        from utils import model  # loads the sentence-transformer only when needed
+        targets = [doc for doc in batch if doc.get("purpose")]
+        if targets:
+            vectors = model.encode([doc["purpose"] for doc in targets], batch_size=64)
+            for doc, vector in zip(targets, vectors):
+                doc["embedding"] = vector.tolist()
+
+
+def source_id(path, position):
+    # Stable _id for a document the file gives none, so re-importing a batch after a crash
+    # hits duplicate keys instead of inserting copies
+    digest = hashlib.sha1(f"{os.path.basename(path)}:{position}".encode()).digest()
+    return ObjectId(digest[:12])
+
+
+def import_collection(name, path, batch_size, checkpoint, embeddings):
+    collection = db[name]
+    done = read_checkpoint(checkpoint) or 0
+    progress = Progress(f"import {name}")
+
+    def flush(batch):
+        apply_embeddings(batch, embeddings)
+        try:
+            collection.insert_many(batch, ordered=False)
+        except BulkWriteError as e:
+            # Duplicate _ids are documents a previous, interrupted run already wrote; documents
+            # without an _id in the file get one from source_id(), so this holds for them too
+            if any(err["code"] != 11000 for err in e.details["writeErrors"]):
+                raise
+
+    with open(path) as f:
+        batch, seen = [], 0
+        for doc in iter_documents(f):
+            seen += 1
+            if seen <= done:
+                continue
+            doc.setdefault("_id", source_id(path, seen))
+            batch.append(doc)
+            if len(batch) >= batch_size:
+                flush(batch)
+                write_checkpoint(checkpoint, seen)
+                progress.add(len(batch))
+                batch = []
+        if batch:
+            flush(batch)
+            write_checkpoint(checkpoint, seen)
+            progress.add(len(batch))
+    progress.done()
+
+
+def export_collection(name, path, batch_size, checkpoint, embeddings, canonical):
+    collection = db[name]
+    options = CANONICAL_JSON_OPTIONS if canonical else RELAXED_JSON_OPTIONS
+    last_id = read_checkpoint(checkpoint)
+    query = {"_id": {"$gt": last_id}} if last_id is not None else {}
+    projection = {"embedding": 0} if embeddings == "skip" else None
+    progress = Progress(f"export {name}")
+
+    # Sorted by _id so a checkpointed export can continue after the last written document
+    cursor = collection.find(query, projection).sort("_id", 1).batch_size(batch_size)
+    with open(path, "a" if last_id is not None else "w") as f:
+        batch = []
+        for doc in cursor:
+            batch.append(doc)
+            if len(batch) >= batch_size:
+                apply_embeddings(batch, embeddings)
+                f.write("".join(json_util.dumps(d, json_options=options) + "\n" for d in batch))
+                f.flush()
+                write_checkpoint(checkpoint, batch[-1]["_id"])
+                progress.add(len(batch))
+                batch = []
+        if batch:
+            apply_embeddings(batch, embeddings)
+            f.write("".join(json_util.dumps(d, json_options=options) + "\n" for d in batch))
+            write_checkpoint(checkpoint, batch[-1]["_id"])
+            progress.add(len(batch))
+    progress.done()
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Stream collections to and from NDJSON / Extended JSON files")
+    ap.add_argument("direction", choices=["import", "export"])
+    ap.add_argument("collection", help="e.g. bookings, employees, bookings_archive, rooms")
+    ap.add_argument("path")
+    ap.add_argument("--batch-size", type=int, default=1000)
+    ap.add_argument("--checkpoint", help="progress file; an existing one resumes the run")
+    ap.add_argument("--embeddings", choices=["keep", "skip", "recompute"], default="keep")
+    ap.add_argument("--canonical", action="store_true", help="export canonical instead of relaxed Extended JSON")
+    args = ap.parse_args(argv)
+
+    if args.direction == "import":
+        import_collection(args.collection, args.path, args.batch_size, args.checkpoint, args.embeddings)
+    else:
+        export_collection(args.collection, args.path, args.batch_size, args.checkpoint, args.embeddings, args.canonical)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,7 @@ from sentence_transformers import SentenceTransformer
 from sklearn.metrics.pairwise import cosine_similarity
 import numpy as np
 import requests
+import metrics
 
 model = SentenceTransformer('all-MiniLM-L6-v2')
 
@@ -14,9 +15,30 @@ def is_purpose_similar(p1, p2, threshold=0.75):
     sim = cosine_similarity([emb1], [emb2])[0][0]
     return sim > threshold, sim
 
-def query_ollama(prompt):
-    response = requests.post(
-        "http://localhost:11434/api/generate",
-        json={"model": "llama3", "prompt": prompt, "stream": False}
-    )
-    return response.json()["response"].strip()
\ No newline at end of file
+OLLAMA_URL = "http://localhost:11434/api/generate"
+
+def ollama_generate(prompt, system=None, model="llama3", options=None, format=None, keep_alive="30m"):
+    # Static instructions go in the `system` field so the rendered prompt always starts
+    # with the same prefix; Ollama keeps that prefix in its KV cache while the model stays
+    # loaded (keep_alive), so only the user utterance has to be evaluated per request.
+    payload = {"model": model, "prompt": prompt, "stream": False, "keep_alive": keep_alive}
+    if system:
+        payload["system"] = system
+    if options:
+        payload["options"] = options
+    if format:
+        # "json" or a JSON schema – Ollama constrains decoding so the reply always parses
+        payload["format"] = format
+    response = requests.post(OLLAMA_URL, json=payload)
+    data = response.json()
+
+    metrics.inc("sementor_llm_calls_total", model=model)
+    metrics.inc("sementor_llm_prompt_eval_tokens_total", data.get("prompt_eval_count", 0), model=model)
+    metrics.inc("sementor_llm_prompt_eval_seconds_total", data.get("prompt_eval_duration", 0) / 1e9, model=model)
+    metrics.inc("sementor_llm_eval_tokens_total", data.get("eval_count", 0), model=model)
+    metrics.inc("sementor_llm_eval_seconds_total", data.get("eval_duration", 0) / 1e9, model=model)
+    metrics.observe("sementor_llm_generated_tokens", data.get("eval_count", 0), buckets=metrics.TOKEN_BUCKETS, model=model)
+    return data
+
+def query_ollama(prompt, system=None, model="llama3", options=None, format=None):
+    return ollama_generate(prompt, system=system, model=model, options=options, format=format)["response"].strip()
\ No newline at end of file